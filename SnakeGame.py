@@ -1,190 +1,274 @@
+import time
+
+# Process start, for measuring the time to the first frame
+STARTED = time.perf_counter()
+
+import argparse
+import os
 import pygame
-import random
-import math
+import sqlite3
 import sys
-from enum import Enum
+import threading
+from collections import deque
 
-# Initialize pygame
-pygame.init()
+from autopilot import Autopilot
+from capture import FrameCapture
+from colors import WHITE, BLACK, GREEN, RED, GOLD, BLUE, PURPLE
+from engine import SnakeEngine, Direction, Difficulty, FoodType, OPPOSITE, FRENZY_FOOD_COUNT
+from profiler import FrameProfiler
+from renderer import BoardRenderer
+from replay import Replay, ReplayRecorder, ReplayPlayer
+from scores import ScoreStore, HUMAN
+from sprites import SpriteCache
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 GRID_SIZE = 20
+# Default board size: exactly one screen. Larger boards scroll with the snake.
 GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
 BASE_SNAKE_SPEED = 10  # Base speed that will be adjusted based on difficulty
-
-# Colors
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-DARK_GRAY = (40, 40, 40)
-GREEN = (46, 204, 113)
-LIGHT_GREEN = (88, 214, 141)
-DARK_GREEN = (39, 174, 96)
-RED = (231, 76, 60)
-GOLD = (241, 196, 15)
-BLUE = (52, 152, 219)
-LIGHT_BLUE = (133, 193, 233)
-PURPLE = (155, 89, 182)
-
-# Direction enum
-class Direction(Enum):
-    UP = (0, -1)
-    DOWN = (0, 1)
-    LEFT = (-1, 0)
-    RIGHT = (1, 0)
-
-# Game difficulty enum
-class Difficulty(Enum):
-    EASY = 8
-    MEDIUM = 12
-    HARD = 16
-
-# Food types
-class FoodType(Enum):
-    REGULAR = 1  # Regular food (red)
-    BONUS = 2    # Bonus food (gold) - worth more points but disappears quickly
-    SPEED = 3    # Speed food (blue) - temporarily increases snake speed
-    SLOW = 4     # Slow food (purple) - temporarily decreases snake speed
+RENDER_FPS = 60  # Frames drawn per second (pygame can't report the display's refresh rate)
+MAX_CATCHUP_TICKS = 3  # Ticks (times the playback speed) allowed back to back after a stall
+INPUT_QUEUE_SIZE = 3  # Turns buffered ahead of the simulation
+LATENCY_SAMPLES = 120
+REPLAY_DIR = "replays"
+METRICS_DIR = "metrics"
+CAPTURE_DIR = "captures"
+CAPTION = "Enhanced Snake Game"
+SCORES_PATH = "scores.db"
+PLAYBACK_SPEEDS = [1, 2, 4, 8, 16]
+SEEK_SECONDS = 5
+# pygame's bundled font, opened by path so no system font lookup happens
+FONT_PATH = os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+SOUND_FILES = ["eat.wav", "crash.wav", "bonus.wav"]
 
 class SnakeGame:
-    def __init__(self):
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, scores=None, replay_dir=None):
+        # Only the subsystems the menu needs; audio starts after the first frame
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Enhanced Snake Game")
+        pygame.display.set_caption(CAPTION)
         self.clock = pygame.time.Clock()
         
         # Load fonts
-        self.title_font = pygame.font.SysFont('Arial', 50, bold=True)
-        self.menu_font = pygame.font.SysFont('Arial', 30)
-        self.game_font = pygame.font.SysFont('Arial', 25)
-        self.small_font = pygame.font.SysFont('Arial', 20)
-        
-        # Background pattern
-        self.bg_pattern = pygame.Surface((GRID_SIZE, GRID_SIZE))
-        self.bg_pattern.fill(BLACK)
-        pygame.draw.rect(self.bg_pattern, DARK_GRAY, (1, 1, GRID_SIZE-2, GRID_SIZE-2))
-        
-        # Load sounds
-        pygame.mixer.init()
-        try:
-            self.eat_sound = pygame.mixer.Sound("eat.wav")
-            self.crash_sound = pygame.mixer.Sound("crash.wav")
-            self.bonus_sound = pygame.mixer.Sound("bonus.wav")
-        except:
-            # If sound files not found, create placeholders
-            self.eat_sound = pygame.mixer.Sound(buffer=bytes(bytearray([0])))
-            self.crash_sound = pygame.mixer.Sound(buffer=bytes(bytearray([0])))
-            self.bonus_sound = pygame.mixer.Sound(buffer=bytes(bytearray([0])))
-            print("Sound files not found. Continuing without sound.")
+        self.title_font = pygame.font.Font(FONT_PATH, 50)
+        self.menu_font = pygame.font.Font(FONT_PATH, 30)
+        self.game_font = pygame.font.Font(FONT_PATH, 25)
+        self.small_font = pygame.font.Font(FONT_PATH, 20)
+        
+        # Cached text and cell sprites, and the board renderer (cached
+        # background, dirty-rect updates)
+        self.sprites = SpriteCache(GRID_SIZE)
+        self.renderer = BoardRenderer(self.screen, GRID_SIZE, self.sprites)
+        self.overlay_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.overlay_surface.fill((0, 0, 0, 128))  # Semi-transparent black
+        self.hud_rects = []
+        
+        # Sounds are loaded by a background thread once the menu is up
+        # (see load_sounds); until then nothing plays
+        self.eat_sound = None
+        self.crash_sound = None
+        self.bonus_sound = None
+        self.sound_loader = None
         
         # Set default game settings
         self.difficulty = Difficulty.MEDIUM
         self.obstacles_enabled = False
         self.special_food_enabled = True
+        self.frenzy_enabled = False
         
-        # Initialize game variables
-        self.speed_modifier = 1.0
-        self.speed_effect_time = 0
-        self.snake_positions = []
-        self.direction = Direction.RIGHT
-        self.next_direction = Direction.RIGHT
-        self.score = 0
-        self.game_over = False
+        # Initialize game variables (the rules live in the headless engine)
+        self.engine = SnakeEngine(grid_width, grid_height)
         self.paused = False
-        self.foods = []
-        self.obstacles = []
+        
+        # Buffered turns as (direction, key press time); one is applied per tick
+        self.input_queue = deque()
+        # Recent input-to-move latencies in milliseconds
+        self.input_latency = deque(maxlen=LATENCY_SAMPLES)
+        # How far the render frame is between the last tick and the next (0..1)
+        self.alpha = 1.0
+        self.render_fps = RENDER_FPS
+        
+        # Every finished game goes into the score store, if there is one
+        # (benchmarks and tests run without); the high score is the best
+        # human run in it on this board with the chosen food setting, and
+        # without one it is the best of this session
+        self.scores = scores
         self.high_score = 0
+        self.high_score = self.load_high_score()
+        # Simulated seconds played in the current game
+        self.game_seconds = 0.0
+        
+        # Every game is recorded and saved to replay_dir when it ends (not
+        # saved without one)
+        self.replay_dir = replay_dir
+        self.recorder = ReplayRecorder()
+        # Visual playback of a saved replay
+        self.player = None
+        self.playback_speed = 1
+        
+        # A toggles a bot that steers instead of the arrow keys (games it
+        # played any part of don't count towards the high score)
+        self.autopilot = Autopilot()
+        self.autopilot_enabled = False
+        self.autopilot_used = False
+        
+        # Per-frame timings (F3 shows them, F4 exports them)
+        self.profiler = FrameProfiler(pygame.font.Font(FONT_PATH, 14))
+        self.metrics_path = None
+        self.panel_rect = None
+        
+        # Session capture to a file (F5 starts and stops it)
+        self.capture = None
+        
+        # Seconds from process start to the first frame on screen
+        self.startup_time = None
+        self.exit_after_first_frame = False
         
         # Start with menu
         self.game_state = "MENU"
         
     def reset_game(self):
-        # Initialize snake in the middle of the screen
-        center_x, center_y = GRID_WIDTH // 2, GRID_HEIGHT // 2
-        self.snake_positions = [(center_x, center_y)]
-        # Add a few initial segments
-        for i in range(1, 3):
-            self.snake_positions.append((center_x - i, center_y))
-        
-        self.direction = Direction.RIGHT
-        self.next_direction = Direction.RIGHT
-        
-        # Game variables
-        self.score = 0
-        self.game_over = False
+        # Push the menu settings into the engine and start a fresh game
+        self.engine.difficulty = self.difficulty
+        self.engine.obstacles_enabled = self.obstacles_enabled
+        self.engine.special_food_enabled = self.special_food_enabled
+        self.engine.food_count = self.food_count()
+        self.high_score = self.load_high_score()
+        self.engine.reset()
+        self.recorder.start(self.engine)
+        self.autopilot.forget()
+        self.autopilot_used = self.autopilot_enabled
+        self.game_seconds = 0.0
+
+        self.input_queue.clear()
         self.paused = False
-        
-        # Food variables
-        self.foods = []
-        self.add_food(FoodType.REGULAR)
-        
-        # Special effects
-        self.speed_modifier = 1.0
-        self.speed_effect_time = 0
-        
-        # Generate obstacles if enabled
-        self.obstacles = []
-        if self.obstacles_enabled:
-            self.generate_obstacles()
     
-    def generate_obstacles(self):
-        num_obstacles = random.randint(5, 10)
-        for _ in range(num_obstacles):
-            # Create small obstacle clusters
-            cluster_center = (random.randint(3, GRID_WIDTH-4), random.randint(3, GRID_HEIGHT-4))
-            cluster_size = random.randint(1, 3)
-            
-            for dx in range(-cluster_size, cluster_size+1):
-                for dy in range(-cluster_size, cluster_size+1):
-                    # Create a somewhat random pattern
-                    if random.random() < 0.6:
-                        pos = (cluster_center[0] + dx, cluster_center[1] + dy)
-                        # Ensure obstacles don't overlap with snake
-                        if pos not in self.snake_positions and 0 <= pos[0] < GRID_WIDTH and 0 <= pos[1] < GRID_HEIGHT:
-                            self.obstacles.append(pos)
+    def food_count(self):
+        return FRENZY_FOOD_COUNT if self.frenzy_enabled else 1
     
-    def add_food(self, food_type=None):
-        if food_type is None:
-            # If special food is enabled, occasionally spawn special food
-            if self.special_food_enabled and random.random() < 0.2:
-                food_type = random.choice([FoodType.BONUS, FoodType.SPEED, FoodType.SLOW])
-            else:
-                food_type = FoodType.REGULAR
-        
-        # Try to find a valid position for the food
-        attempts = 0
-        while attempts < 100:  # Prevent infinite loop
-            pos = (random.randint(0, GRID_WIDTH-1), random.randint(0, GRID_HEIGHT-1))
-            if pos not in self.snake_positions and pos not in self.obstacles and pos not in [f[0] for f in self.foods]:
-                # For bonus food, set a timer
-                timer = 0
-                if food_type == FoodType.BONUS:
-                    timer = pygame.time.get_ticks() + 5000  # 5 seconds
-                
-                self.foods.append((pos, food_type, timer))
-                break
-            attempts += 1
+    def load_high_score(self):
+        if self.scores is None:
+            return self.high_score
+        try:
+            return self.scores.best(HUMAN, self.food_count(), self.engine.grid_width, self.engine.grid_height)
+        except sqlite3.Error as e:
+            print(f"Could not read the high score: {e}")
+            return 0
+    
+    def start_replay(self, replay):
+        # Watch a saved game instead of playing
+        self.player = ReplayPlayer(replay)
+        self.engine = self.player.engine
+        self.difficulty = replay.difficulty
+        self.playback_speed = 1
+        self.paused = False
+        self.game_state = "REPLAY"
+    
+    def load_sounds(self):
+        # Runs on the sound loader thread, once the mixer is open; only
+        # decodes the files
+        try:
+            eat, crash, bonus = [pygame.mixer.Sound(name) for name in SOUND_FILES]
+        except (pygame.error, OSError):
+            print("Sound files not found. Continuing without sound.")
+            return
+        self.eat_sound, self.crash_sound, self.bonus_sound = eat, crash, bonus
+    
+    def play_sound(self, sound):
+        if sound is not None:
+            sound.play()
+    
+    def save_replay(self):
+        if self.replay_dir is None:
+            return None
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-score{self.engine.score}.snkr"
+        path = os.path.join(self.replay_dir, name)
+        try:
+            os.makedirs(self.replay_dir, exist_ok=True)
+            self.recorder.save(path)
+        except OSError as e:
+            print(f"Could not save replay: {e}")
+            return None
+        return path
+    
+    def save_score(self):
+        if self.scores is None:
+            return
+        try:
+            self.scores.record(self.engine, self.game_seconds,
+                               "autopilot" if self.autopilot_used else HUMAN)
+        except sqlite3.Error as e:
+            print(f"Could not save score: {e}")
     
     def handle_keys(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
             elif event.type == pygame.KEYDOWN:
-                if self.game_state == "MENU":
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                elif event.key == pygame.K_F4:
+                    self.export_metrics()
+                elif event.key == pygame.K_F5:
+                    if self.capture is None:
+                        self.start_capture()
+                    else:
+                        self.stop_capture()
+                elif self.game_state == "MENU":
                     self.handle_menu_keys(event.key)
                 elif self.game_state == "PLAYING":
-                    if self.game_over:
+                    if self.engine.game_over:
                         if event.key == pygame.K_r:
                             self.reset_game()
                         elif event.key == pygame.K_m:
                             self.game_state = "MENU"
                         elif event.key == pygame.K_q:
-                            pygame.quit()
-                            sys.exit()
+                            self.quit()
                     else:
                         self.handle_game_keys(event.key)
+                elif self.game_state == "REPLAY":
+                    self.handle_replay_keys(event.key)
+    
+    def export_metrics(self):
+        path = self.metrics_path
+        if path is None:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            path = os.path.join(METRICS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.csv")
+        try:
+            self.profiler.export(path)
+        except OSError as e:
+            print(f"Could not export metrics: {e}")
+            return
+        print(f"Metrics written to {path}")
+    
+    def start_capture(self, path=None):
+        if path is None:
+            os.makedirs(CAPTURE_DIR, exist_ok=True)
+            path = os.path.join(CAPTURE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.snkv")
+        try:
+            self.capture = FrameCapture(path, self.screen)
+        except OSError as e:
+            print(f"Could not start capture: {e}")
+            return
+        # In the title bar, so it doesn't end up in the frames
+        pygame.display.set_caption(f"{CAPTION} - capturing")
+        print(f"Capturing to {path}")
+    
+    def stop_capture(self):
+        capture = self.capture
+        self.capture = None
+        pygame.display.set_caption(CAPTION)
+        try:
+            capture.close()
+        except OSError as e:
+            print(f"Could not write capture: {e}")
+            return
+        print(f"Capture written to {capture.path}: {capture.written} frames, "
+              f"{capture.dropped} dropped")
     
     def handle_menu_keys(self, key):
         if key == pygame.K_1 or key == pygame.K_KP1:
@@ -197,6 +281,9 @@ class SnakeGame:
             self.obstacles_enabled = not self.obstacles_enabled
         elif key == pygame.K_s:
             self.special_food_enabled = not self.special_food_enabled
+        elif key == pygame.K_f:
+            self.frenzy_enabled = not self.frenzy_enabled
+            self.high_score = self.load_high_score()
         elif key == pygame.K_RETURN:
             self.game_state = "PLAYING"
             self.reset_game()
@@ -204,311 +291,363 @@ class SnakeGame:
     def handle_game_keys(self, key):
         if key == pygame.K_p:
             self.paused = not self.paused
-        elif key == pygame.K_UP and self.direction != Direction.DOWN:
-            self.next_direction = Direction.UP
-        elif key == pygame.K_DOWN and self.direction != Direction.UP:
-            self.next_direction = Direction.DOWN
-        elif key == pygame.K_LEFT and self.direction != Direction.RIGHT:
-            self.next_direction = Direction.LEFT
-        elif key == pygame.K_RIGHT and self.direction != Direction.LEFT:
-            self.next_direction = Direction.RIGHT
+        elif key == pygame.K_UP:
+            self.queue_turn(Direction.UP)
+        elif key == pygame.K_DOWN:
+            self.queue_turn(Direction.DOWN)
+        elif key == pygame.K_LEFT:
+            self.queue_turn(Direction.LEFT)
+        elif key == pygame.K_RIGHT:
+            self.queue_turn(Direction.RIGHT)
+        elif key == pygame.K_a:
+            self.autopilot_enabled = not self.autopilot_enabled
+            self.autopilot_used = self.autopilot_used or self.autopilot_enabled
+            self.autopilot.forget()
+            self.input_queue.clear()
     
-    def update(self):
-        if self.game_state != "PLAYING" or self.game_over or self.paused:
+    def handle_replay_keys(self, key):
+        player = self.player
+        seek = SEEK_SECONDS * self.difficulty.value
+        if key == pygame.K_p or key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif key == pygame.K_RIGHT:
+            player.seek(player.position + seek)
+        elif key == pygame.K_LEFT:
+            player.seek(player.position - seek)
+        elif key == pygame.K_UP:
+            index = PLAYBACK_SPEEDS.index(self.playback_speed)
+            self.playback_speed = PLAYBACK_SPEEDS[min(index + 1, len(PLAYBACK_SPEEDS) - 1)]
+        elif key == pygame.K_DOWN:
+            index = PLAYBACK_SPEEDS.index(self.playback_speed)
+            self.playback_speed = PLAYBACK_SPEEDS[max(index - 1, 0)]
+        elif key == pygame.K_r:
+            player.restart()
+        elif key == pygame.K_q or key == pygame.K_ESCAPE:
+            self.quit()
+    
+    def queue_turn(self, direction):
+        # Buffer a turn so quick presses within one tick are all applied.
+        # Each turn is checked against the one before it, not the current
+        # heading, so UP then LEFT while moving right works.
+        last = self.input_queue[-1][0] if self.input_queue else self.engine.direction
+        if direction == last or direction == OPPOSITE[last]:
             return
-        
-        # Update direction
-        self.direction = self.next_direction
-        
-        # Calculate new head position
-        head_x, head_y = self.snake_positions[0]
-        dx, dy = self.direction.value
-        new_head = ((head_x + dx) % GRID_WIDTH, (head_y + dy) % GRID_HEIGHT)
-        
-        # Check for collisions with obstacles
-        if new_head in self.obstacles:
-            self.game_over = True
-            self.crash_sound.play()
+        if len(self.input_queue) < INPUT_QUEUE_SIZE:
+            self.input_queue.append((direction, time.perf_counter()))
+    
+    def average_input_latency(self):
+        # Mean input-to-move latency in milliseconds over recent turns
+        if not self.input_latency:
+            return 0.0
+        return sum(self.input_latency) / len(self.input_latency)
+    
+    def update(self):
+        if self.game_state == "REPLAY":
+            if not self.paused:
+                self.player.step()
             return
-        
-        # Check for collision with self
-        if new_head in self.snake_positions:
-            self.game_over = True
-            self.crash_sound.play()
+        if self.game_state != "PLAYING" or self.engine.game_over or self.paused:
             return
         
-        # Move snake
-        self.snake_positions.insert(0, new_head)
-        
-        # Check for food collisions
-        ate_food = False
-        for i, (food_pos, food_type, timer) in enumerate(self.foods):
-            if new_head == food_pos:
-                # Remove the food
-                self.foods.pop(i)
-                
-                # Apply food effects
-                if food_type == FoodType.REGULAR:
-                    self.score += 10
-                    self.eat_sound.play()
-                elif food_type == FoodType.BONUS:
-                    self.score += 50
-                    self.bonus_sound.play()
-                elif food_type == FoodType.SPEED:
-                    self.speed_modifier = 1.5
-                    self.speed_effect_time = pygame.time.get_ticks() + 5000  # 5 seconds
-                    self.eat_sound.play()
-                elif food_type == FoodType.SLOW:
-                    self.speed_modifier = 0.7
-                    self.speed_effect_time = pygame.time.get_ticks() + 5000  # 5 seconds
-                    self.eat_sound.play()
-                
-                # Don't remove the tail when eating
-                ate_food = True
-                
-                # Add a new food
-                self.add_food()
-                break
-        
-        # Remove tail if no food was eaten
-        if not ate_food:
-            self.snake_positions.pop()
+        direction = None
+        if self.autopilot_enabled:
+            self.input_queue.clear()
+            direction = self.autopilot.decide(self.engine)
+        elif self.input_queue:
+            direction, pressed_at = self.input_queue.popleft()
+            self.input_latency.append((time.perf_counter() - pressed_at) * 1000)
+        self.game_seconds += self.tick_length()
+        eaten = self.engine.step(direction)
+        self.recorder.record()
+        
+        # Play sounds for whatever happened this tick
+        if self.engine.game_over:
+            self.play_sound(self.crash_sound)
+            self.save_replay()
+            self.save_score()
+        elif eaten == FoodType.BONUS:
+            self.play_sound(self.bonus_sound)
+        elif eaten is not None:
+            self.play_sound(self.eat_sound)
         
         # Update high score
-        if self.score > self.high_score:
-            self.high_score = self.score
-        
-        # Check for expired bonus food
-        current_time = pygame.time.get_ticks()
-        self.foods = [(pos, type, timer) for pos, type, timer in self.foods if timer == 0 or timer > current_time]
-        
-        # Add new bonus food occasionally
-        if self.special_food_enabled and random.random() < 0.005 and not any(f[1] == FoodType.BONUS for f in self.foods):
-            self.add_food(FoodType.BONUS)
-        
-        # Check for speed effect expiration
-        if self.speed_effect_time > 0 and current_time > self.speed_effect_time:
-            self.speed_modifier = 1.0
-            self.speed_effect_time = 0
+        if self.engine.score > self.high_score and not self.autopilot_used:
+            self.high_score = self.engine.score
     
     def draw_menu(self):
         self.screen.fill(BLACK)
         
         # Draw title
-        title = self.title_font.render("ENHANCED SNAKE", True, GREEN)
+        title = self.sprites.text("ENHANCED SNAKE", self.title_font, GREEN)
         self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 50))
         
         # Draw options
         y_pos = 150
         difficulty_text = f"Difficulty: "
-        self.screen.blit(self.menu_font.render(difficulty_text, True, WHITE), (SCREEN_WIDTH//2 - 150, y_pos))
+        self.screen.blit(self.sprites.text(difficulty_text, self.menu_font, WHITE), (SCREEN_WIDTH//2 - 150, y_pos))
         
         # Draw difficulty options with the selected one highlighted
         easy_color = GOLD if self.difficulty == Difficulty.EASY else WHITE
         medium_color = GOLD if self.difficulty == Difficulty.MEDIUM else WHITE
         hard_color = GOLD if self.difficulty == Difficulty.HARD else WHITE
         
-        self.screen.blit(self.menu_font.render("1. Easy", True, easy_color), (SCREEN_WIDTH//2 + 50, y_pos))
+        self.screen.blit(self.sprites.text("1. Easy", self.menu_font, easy_color), (SCREEN_WIDTH//2 + 50, y_pos))
         y_pos += 40
-        self.screen.blit(self.menu_font.render("2. Medium", True, medium_color), (SCREEN_WIDTH//2 + 50, y_pos))
+        self.screen.blit(self.sprites.text("2. Medium", self.menu_font, medium_color), (SCREEN_WIDTH//2 + 50, y_pos))
         y_pos += 40
-        self.screen.blit(self.menu_font.render("3. Hard", True, hard_color), (SCREEN_WIDTH//2 + 50, y_pos))
+        self.screen.blit(self.sprites.text("3. Hard", self.menu_font, hard_color), (SCREEN_WIDTH//2 + 50, y_pos))
         y_pos += 60
         
         # Draw other options
         obstacles_text = f"Obstacles: {'ON' if self.obstacles_enabled else 'OFF'} (press O to toggle)"
-        self.screen.blit(self.menu_font.render(obstacles_text, True, WHITE), (SCREEN_WIDTH//2 - 200, y_pos))
+        self.screen.blit(self.sprites.text(obstacles_text, self.menu_font, WHITE), (SCREEN_WIDTH//2 - 200, y_pos))
         y_pos += 40
         
         special_food_text = f"Special Food: {'ON' if self.special_food_enabled else 'OFF'} (press S to toggle)"
-        self.screen.blit(self.menu_font.render(special_food_text, True, WHITE), (SCREEN_WIDTH//2 - 200, y_pos))
+        self.screen.blit(self.sprites.text(special_food_text, self.menu_font, WHITE), (SCREEN_WIDTH//2 - 200, y_pos))
+        y_pos += 40
+        
+        frenzy_text = f"Food Frenzy: {'ON' if self.frenzy_enabled else 'OFF'} (press F to toggle)"
+        self.screen.blit(self.sprites.text(frenzy_text, self.menu_font, WHITE), (SCREEN_WIDTH//2 - 200, y_pos))
         y_pos += 80
         
         # Draw instructions
         start_text = "Press ENTER to Start"
-        self.screen.blit(self.menu_font.render(start_text, True, GREEN), (SCREEN_WIDTH//2 - 100, y_pos))
+        self.screen.blit(self.sprites.text(start_text, self.menu_font, GREEN), (SCREEN_WIDTH//2 - 100, y_pos))
         y_pos += 60
         
-        controls_text = "Controls: Arrow Keys to move, P to pause"
-        self.screen.blit(self.small_font.render(controls_text, True, WHITE), (SCREEN_WIDTH//2 - 180, y_pos))
+        controls_text = self.sprites.text("Controls: Arrow Keys to move, P to pause, A for autopilot", self.small_font, WHITE)
+        self.screen.blit(controls_text, (SCREEN_WIDTH//2 - controls_text.get_width()//2, y_pos))
         
         # Draw high score
         high_score_text = f"High Score: {self.high_score}"
-        self.screen.blit(self.small_font.render(high_score_text, True, GOLD), (SCREEN_WIDTH - 200, 20))
+        self.screen.blit(self.sprites.text(high_score_text, self.small_font, GOLD), (SCREEN_WIDTH - 200, 20))
     
     def draw_game(self):
-        # Draw background pattern
-        for x in range(0, SCREEN_WIDTH, GRID_SIZE):
-            for y in range(0, SCREEN_HEIGHT, GRID_SIZE):
-                self.screen.blit(self.bg_pattern, (x, y))
-        
-        # Draw obstacles
-        for x, y in self.obstacles:
-            pygame.draw.rect(self.screen, (100, 100, 100), 
-                            (x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE))
-            # Add some texture to obstacles
-            pygame.draw.line(self.screen, (70, 70, 70), 
-                           (x * GRID_SIZE, y * GRID_SIZE), 
-                           (x * GRID_SIZE + GRID_SIZE, y * GRID_SIZE + GRID_SIZE), 3)
-            pygame.draw.line(self.screen, (70, 70, 70), 
-                           (x * GRID_SIZE + GRID_SIZE, y * GRID_SIZE), 
-                           (x * GRID_SIZE, y * GRID_SIZE + GRID_SIZE), 3)
-        
-        # Draw food with pulsing effect
-        pulse = (math.sin(pygame.time.get_ticks() * 0.01) + 1) * 0.1 + 0.8
-        for pos, food_type, timer in self.foods:
-            food_x, food_y = pos
-            rect = (food_x * GRID_SIZE, food_y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-            
-            if food_type == FoodType.REGULAR:
-                color = RED
-                pygame.draw.ellipse(self.screen, (color[0]*pulse, color[1]*pulse, color[2]*pulse), rect)
-            elif food_type == FoodType.BONUS:
-                color = GOLD
-                # Draw with blinking effect if about to expire
-                if timer == 0 or timer - pygame.time.get_ticks() > 1000 or (pygame.time.get_ticks() // 200) % 2:
-                    pygame.draw.ellipse(self.screen, (color[0]*pulse, color[1]*pulse, color[2]*pulse), rect)
-                    pygame.draw.line(self.screen, WHITE, 
-                                   (food_x * GRID_SIZE + GRID_SIZE//2, food_y * GRID_SIZE + 2), 
-                                   (food_x * GRID_SIZE + GRID_SIZE//2, food_y * GRID_SIZE + GRID_SIZE - 2), 2)
-                    pygame.draw.line(self.screen, WHITE, 
-                                   (food_x * GRID_SIZE + 2, food_y * GRID_SIZE + GRID_SIZE//2), 
-                                   (food_x * GRID_SIZE + GRID_SIZE - 2, food_y * GRID_SIZE + GRID_SIZE//2), 2)
-            elif food_type == FoodType.SPEED:
-                color = BLUE
-                pygame.draw.ellipse(self.screen, (color[0]*pulse, color[1]*pulse, color[2]*pulse), rect)
-                # Add arrow symbol
-                arrow_points = [
-                    (food_x * GRID_SIZE + GRID_SIZE//2, food_y * GRID_SIZE + 4),
-                    (food_x * GRID_SIZE + GRID_SIZE - 4, food_y * GRID_SIZE + GRID_SIZE//2),
-                    (food_x * GRID_SIZE + GRID_SIZE//2, food_y * GRID_SIZE + GRID_SIZE - 4)
-                ]
-                pygame.draw.polygon(self.screen, WHITE, arrow_points)
-            elif food_type == FoodType.SLOW:
-                color = PURPLE
-                pygame.draw.ellipse(self.screen, (color[0]*pulse, color[1]*pulse, color[2]*pulse), rect)
-                # Add slow symbol
-                pygame.draw.rect(self.screen, WHITE, 
-                              (food_x * GRID_SIZE + 4, food_y * GRID_SIZE + GRID_SIZE//2 - 2, 
-                               GRID_SIZE - 8, 4))
-        
-        # Draw snake
-        for i, (x, y) in enumerate(self.snake_positions):
-            # Different colors for head, body segments
-            if i == 0:  # Head
-                color = DARK_GREEN
-                # Draw with a slightly larger size for the head
-                rect = pygame.Rect(x * GRID_SIZE - 1, y * GRID_SIZE - 1, GRID_SIZE + 2, GRID_SIZE + 2)
-                pygame.draw.rect(self.screen, color, rect, border_radius=4)
-                
-                # Draw eyes based on direction
-                eye_size = GRID_SIZE // 5
-                eye_offset_x = GRID_SIZE // 3
-                eye_offset_y = GRID_SIZE // 3
-                
-                # Adjust eye positions based on direction
-                if self.direction == Direction.RIGHT:
-                    left_eye = (x * GRID_SIZE + GRID_SIZE - eye_offset_x, y * GRID_SIZE + eye_offset_y)
-                    right_eye = (x * GRID_SIZE + GRID_SIZE - eye_offset_x, y * GRID_SIZE + GRID_SIZE - eye_offset_y)
-                elif self.direction == Direction.LEFT:
-                    left_eye = (x * GRID_SIZE + eye_offset_x, y * GRID_SIZE + eye_offset_y)
-                    right_eye = (x * GRID_SIZE + eye_offset_x, y * GRID_SIZE + GRID_SIZE - eye_offset_y)
-                elif self.direction == Direction.UP:
-                    left_eye = (x * GRID_SIZE + eye_offset_x, y * GRID_SIZE + eye_offset_y)
-                    right_eye = (x * GRID_SIZE + GRID_SIZE - eye_offset_x, y * GRID_SIZE + eye_offset_y)
-                else:  # DOWN
-                    left_eye = (x * GRID_SIZE + eye_offset_x, y * GRID_SIZE + GRID_SIZE - eye_offset_y)
-                    right_eye = (x * GRID_SIZE + GRID_SIZE - eye_offset_x, y * GRID_SIZE + GRID_SIZE - eye_offset_y)
-                
-                pygame.draw.circle(self.screen, WHITE, left_eye, eye_size)
-                pygame.draw.circle(self.screen, WHITE, right_eye, eye_size)
-                
-                # Draw pupils
-                pygame.draw.circle(self.screen, BLACK, 
-                                 (left_eye[0] + eye_size//3, left_eye[1]), eye_size//2)
-                pygame.draw.circle(self.screen, BLACK, 
-                                 (right_eye[0] + eye_size//3, right_eye[1]), eye_size//2)
-                
-            else:  # Body
-                # Alternate colors for body segments
-                color = GREEN if i % 2 == 0 else LIGHT_GREEN
-                
-                # Draw rounded segments with connection gaps
-                rect = pygame.Rect(x * GRID_SIZE + 1, y * GRID_SIZE + 1, GRID_SIZE - 2, GRID_SIZE - 2)
-                pygame.draw.rect(self.screen, color, rect, border_radius=3)
+        # Draws the game screen and returns the rects that changed
+        engine = self.engine
+        overlay = engine.game_over or self.paused
+        
+        # Last frame's HUD text covered some board cells
+        for rect in self.hud_rects:
+            self.renderer.invalidate_rect(rect)
+        rects = self.renderer.draw(engine, pygame.time.get_ticks(), full=overlay, alpha=self.alpha)
+        self.hud_rects = []
         
         # Draw score and game info
-        score_text = self.game_font.render(f'Score: {self.score}', True, WHITE)
-        self.screen.blit(score_text, (10, 10))
+        score_text = self.sprites.text(f'Score: {engine.score}', self.game_font, WHITE)
+        self.hud_rects.append(self.screen.blit(score_text, (10, 10)))
         
         # Draw high score
-        high_score_text = self.game_font.render(f'High Score: {self.high_score}', True, GOLD)
-        self.screen.blit(high_score_text, (SCREEN_WIDTH - high_score_text.get_width() - 10, 10))
+        high_score_text = self.sprites.text(f'High Score: {self.high_score}', self.game_font, GOLD)
+        self.hud_rects.append(self.screen.blit(high_score_text, (SCREEN_WIDTH - high_score_text.get_width() - 10, 10)))
         
         # Draw current speed effect if active
-        if self.speed_effect_time > 0:
-            if self.speed_modifier > 1:
-                speed_text = self.small_font.render('SPEED BOOST!', True, BLUE)
+        if engine.speed_effect_time > 0:
+            if engine.speed_modifier > 1:
+                speed_text = self.sprites.text('SPEED BOOST!', self.small_font, BLUE)
             else:
-                speed_text = self.small_font.render('SLOWED DOWN!', True, PURPLE)
+                speed_text = self.sprites.text('SLOWED DOWN!', self.small_font, PURPLE)
             
             # Calculate time remaining
-            time_left = max(0, (self.speed_effect_time - pygame.time.get_ticks()) // 1000)
-            time_text = self.small_font.render(f'{time_left}s', True, WHITE)
+            time_left = max(0, (engine.speed_effect_time - engine.tick) // self.difficulty.value)
+            time_text = self.sprites.text(f'{time_left}s', self.small_font, WHITE)
             
-            self.screen.blit(speed_text, (10, 40))
-            self.screen.blit(time_text, (speed_text.get_width() + 20, 40))
+            self.hud_rects.append(self.screen.blit(speed_text, (10, 40)))
+            self.hud_rects.append(self.screen.blit(time_text, (speed_text.get_width() + 20, 40)))
+        
+        # Playback position and speed
+        if self.game_state == "REPLAY":
+            player = self.player
+            replay_text = self.sprites.text(
+                f'REPLAY x{self.playback_speed}  {player.position}/{len(player.replay)}', self.small_font, GOLD)
+            self.hud_rects.append(self.screen.blit(replay_text, (10, SCREEN_HEIGHT - 30)))
+        elif self.autopilot_enabled:
+            autopilot_text = self.sprites.text('AUTOPILOT (A to take over)', self.small_font, GOLD)
+            self.hud_rects.append(self.screen.blit(autopilot_text, (10, SCREEN_HEIGHT - 30)))
+        rects.extend(self.hud_rects)
         
         # Display game over message
-        if self.game_over:
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-            self.screen.blit(overlay, (0, 0))
+        if engine.game_over:
+            self.screen.blit(self.overlay_surface, (0, 0))
             
-            game_over_text = self.title_font.render('GAME OVER', True, RED)
+            game_over_text = self.sprites.text('GAME OVER', self.title_font, RED)
             text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 50))
             self.screen.blit(game_over_text, text_rect)
             
-            instructions = self.menu_font.render('Press R to Restart, M for Menu, Q to Quit', True, WHITE)
+            if self.game_state == "REPLAY":
+                instructions = self.sprites.text('Press R to Replay again, LEFT to Rewind, Q to Quit', self.menu_font, WHITE)
+            else:
+                instructions = self.sprites.text('Press R to Restart, M for Menu, Q to Quit', self.menu_font, WHITE)
             inst_rect = instructions.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 20))
             self.screen.blit(instructions, inst_rect)
             
-            final_score = self.game_font.render(f'Final Score: {self.score}', True, WHITE)
+            final_score = self.sprites.text(f'Final Score: {engine.score}', self.game_font, WHITE)
             score_rect = final_score.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 70))
             self.screen.blit(final_score, score_rect)
         
         # Display pause message
         elif self.paused:
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-            self.screen.blit(overlay, (0, 0))
+            self.screen.blit(self.overlay_surface, (0, 0))
             
-            pause_text = self.title_font.render('PAUSED', True, WHITE)
+            pause_text = self.sprites.text('PAUSED', self.title_font, WHITE)
             text_rect = pause_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
             self.screen.blit(pause_text, text_rect)
             
-            instruction = self.menu_font.render('Press P to Resume', True, WHITE)
+            resume_key = 'SPACE' if self.game_state == "REPLAY" else 'P'
+            instruction = self.sprites.text(f'Press {resume_key} to Resume', self.menu_font, WHITE)
             inst_rect = instruction.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
             self.screen.blit(instruction, inst_rect)
+        
+        # Overlays cover the whole board, so the next frame starts from scratch
+        if overlay:
+            self.renderer.invalidate()
+        return rects
     
     def draw(self):
+        # Draws the frame; returns the rects to update, or None for the whole screen
         if self.game_state == "MENU":
             self.draw_menu()
-        elif self.game_state == "PLAYING":
-            self.draw_game()
-        
-        pygame.display.update()
+            # The game screen has to be redrawn in full after the menu
+            self.renderer.invalidate()
+            rects = None
+        else:
+            # Uncover the board wherever the profiler panel no longer is
+            if self.panel_rect is not None and not self.profiler.visible:
+                self.renderer.invalidate_rect(self.panel_rect)
+                self.panel_rect = None
+            rects = self.draw_game()
+        
+        if self.profiler.visible:
+            panel_rect = self.profiler.draw(self.screen)
+            if rects is not None:
+                if self.panel_rect is not None and self.panel_rect != panel_rect:
+                    self.renderer.invalidate_rect(self.panel_rect)
+                rects.append(panel_rect)
+            self.panel_rect = panel_rect
+        return rects
+    
+    def tick_length(self):
+        # Seconds per simulation tick, based on difficulty and any active effects
+        speed = self.playback_speed if self.game_state == "REPLAY" else 1
+        return 1.0 / (self.difficulty.value * self.engine.speed_modifier * speed)
+    
+    def simulating(self):
+        if self.game_state == "REPLAY":
+            return not self.player.finished and not self.paused
+        return self.game_state == "PLAYING" and not self.engine.game_over and not self.paused
     
     def run(self):
+        # Fixed-timestep loop: input and rendering run at RENDER_FPS,
+        # the simulation steps at the difficulty rate from an accumulator
+        accumulator = 0.0
+        previous = time.perf_counter()
+        clock = time.perf_counter
         while True:
+            now = clock()
+            accumulator += now - previous
+            previous = now
+            
             self.handle_keys()
-            self.update()
-            self.draw()
+            keys_done = clock()
             
-            # Adjust speed based on difficulty and any active effects
-            snake_speed = self.difficulty.value * self.speed_modifier
-            self.clock.tick(snake_speed)
+            ticks = 0
+            target_tick_rate = 0.0
+            if self.simulating():
+                # Fast playback runs several ticks every frame, so it gets
+                # proportionally more room to catch up
+                catchup = MAX_CATCHUP_TICKS * (self.playback_speed if self.game_state == "REPLAY" else 1)
+                accumulator = min(accumulator, catchup * self.tick_length())
+                while accumulator >= self.tick_length() and self.simulating():
+                    accumulator -= self.tick_length()
+                    self.update()
+                    ticks += 1
+                self.alpha = min(accumulator / self.tick_length(), 1.0)
+                target_tick_rate = 1.0 / self.tick_length()
+            else:
+                # Nothing is moving, so there is no time to catch up on later
+                accumulator = 0.0
+                self.alpha = 1.0
+            update_done = clock()
+            
+            rects = self.draw()
+            draw_done = clock()
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+            # Copying the frame for the capture counts towards display
+            if self.capture is not None:
+                self.capture.capture(self.screen)
+            display_done = clock()
+            if self.startup_time is None:
+                self.first_frame_shown(display_done)
+            
+            self.profiler.record(now, (keys_done - now, update_done - keys_done,
+                                       draw_done - update_done, display_done - draw_done),
+                                 ticks, target_tick_rate, self.clock.get_fps(),
+                                 len(self.engine.snake_positions), len(self.engine.foods),
+                                 self.average_input_latency())
+            self.clock.tick(self.render_fps)
+    
+    def first_frame_shown(self, now):
+        self.startup_time = now - STARTED
+        if self.exit_after_first_frame:
+            print(f"First frame after {self.startup_time * 1000:.1f} ms")
+            self.quit()
+        # Now that something is on screen, open the audio device here on the
+        # main thread and decode the sounds in the background
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"No audio device ({e}). Continuing without sound.")
+            return
+        self.sound_loader = threading.Thread(target=self.load_sounds, daemon=True)
+        self.sound_loader.start()
+    
+    def quit(self):
+        if self.capture is not None:
+            self.stop_capture()
+        if self.metrics_path:
+            self.export_metrics()
+        if self.input_latency:
+            print(f"Average input-to-move latency: {self.average_input_latency():.1f} ms")
+        if self.scores is not None:
+            self.scores.close()
+        pygame.quit()
+        sys.exit()
 
 if __name__ == "__main__":
-    game = SnakeGame()
+    parser = argparse.ArgumentParser(description="Enhanced Snake Game")
+    parser.add_argument("--replay", metavar="FILE", help="play back a saved replay")
+    parser.add_argument("--width", type=int, default=GRID_WIDTH, help="board width in cells")
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT, help="board height in cells")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="start a game right away with the autopilot steering")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print the time from launch to the first frame and exit")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write frame metrics here on exit and on F4 (.csv or .json)")
+    parser.add_argument("--capture", metavar="FILE",
+                        help="capture the session to this file from the start (F5 stops it)")
+    args = parser.parse_args()
+    if args.width < GRID_WIDTH or args.height < GRID_HEIGHT:
+        parser.error(f"the board must be at least {GRID_WIDTH}x{GRID_HEIGHT} cells (one screen)")
+    
+    try:
+        scores = ScoreStore(SCORES_PATH)
+    except sqlite3.Error as e:
+        print(f"Could not open the score store: {e}")
+        scores = None
+    game = SnakeGame(args.width, args.height, scores, REPLAY_DIR)
+    game.metrics_path = args.metrics
+    game.exit_after_first_frame = args.startup_time
+    if args.capture:
+        game.start_capture(args.capture)
+    if args.replay:
+        game.start_replay(Replay.load(args.replay))
+    elif args.autopilot:
+        game.autopilot_enabled = True
+        game.game_state = "PLAYING"
+        game.reset_game()
     game.run()
\ No newline at end of file
@@ -0,0 +1,340 @@
+import argparse
+import time
+
+from engine import (SnakeEngine, Direction, Difficulty, FoodType, SNAKE, OBSTACLE, FOOD_BASE,
+                    FOOD_BY_CODE)
+
+# A bot that plays the engine. Each decision is held to a time budget:
+# paths to food are found with a breadth-first search that stops when its
+# share of the budget runs out (and then heads for the searched cell
+# nearest the food), and the plan is followed over the next ticks without
+# searching again. A plan is only taken if a bounded flood fill shows the
+# snake will still have room once it gets to the end of it (cells only
+# free up while it is followed, so it stays safe); otherwise the snake
+# chases its tail.
+
+DEFAULT_BUDGET_US = 1000
+# Share of the budget the path search may use, and the searches and safety
+# checks together; the rest covers the work left after the last clock read
+SEARCH_SHARE = 0.65
+CHECK_SHARE = 0.9
+# Cells checked per clock read in the searches
+CLOCK_EVERY = 32
+# A move is safe if the snake can still reach its tail or this many cells
+# (or its own length, if shorter)
+SPACE_CAP = 400
+# Points per food type; foods that only change the speed are eaten only
+# when nothing better is in reach (eating one still brings new food)
+FOOD_VALUE = {FoodType.REGULAR: 10, FoodType.BONUS: 50, FoodType.SPEED: 0, FoodType.SLOW: 0}
+
+# Moves in the order neighbours() lists them
+MOVES = [Direction.RIGHT, Direction.LEFT, Direction.DOWN, Direction.UP]
+
+def neighbours(cell, width, height):
+    # Cells right, left, below and above, wrapping round the board edges
+    y, x = divmod(cell, width)
+    row = cell - x
+    return (row + (x + 1) % width, row + (x - 1) % width,
+            (y + 1) % height * width + x, (y - 1) % height * width + x)
+
+def wrapped_distance(a, b, width, height):
+    ay, ax = divmod(a, width)
+    by, bx = divmod(b, width)
+    dx, dy = abs(ax - bx), abs(ay - by)
+    return min(dx, width - dx) + min(dy, height - dy)
+
+class Autopilot:
+    def __init__(self, budget_us=DEFAULT_BUDGET_US):
+        self.budget = budget_us / 1e6
+        # Cells still to walk (next one last) and the food they lead to
+        self.plan = []
+        self.target = None
+        self.planned_for = None
+        # Body cells -> the tick each became the head, kept up to date one
+        # step at a time (see track)
+        self.entered = {}
+        self.tracked_for = None
+        self.tracked_tick = None
+        # Timing of every decision so far
+        self.decisions = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.over_budget = 0
+
+    def forget(self):
+        self.plan = []
+        self.target = None
+
+    def decide(self, engine):
+        # Direction for the engine's next step
+        start = time.perf_counter()
+        direction = self.choose(engine, start)
+        elapsed = time.perf_counter() - start
+        self.decisions += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if elapsed > self.budget:
+            self.over_budget += 1
+        return direction
+
+    def track(self, engine, head):
+        # Bring `entered` up to date: one head in and one tail out per step,
+        # or the whole body again on a new game or after steps not seen here
+        key = (engine, engine.generation)
+        if key == self.tracked_for and engine.tick == self.tracked_tick:
+            return
+        if key == self.tracked_for and engine.tick == self.tracked_tick + 1:
+            if engine.last_tail is not None:
+                tail_x, tail_y = engine.last_tail
+                del self.entered[tail_y * engine.grid_width + tail_x]
+            self.entered[head] = engine.tick
+        else:
+            width = engine.grid_width
+            self.entered = {y * width + x: engine.tick - i
+                            for i, (x, y) in enumerate(engine.snake_positions)}
+        self.tracked_for = key
+        self.tracked_tick = engine.tick
+
+    def choose(self, engine, start):
+        width, height = engine.grid_width, engine.grid_height
+        head_x, head_y = engine.snake_positions[0]
+        head = head_y * width + head_x
+        grid = engine.grid
+        deadline = start + self.budget * CHECK_SHARE
+        self.track(engine, head)
+
+        # A plan is dropped on a new game, when its food is gone, when the
+        # bonus foods on the board change, or when something got in the way
+        key = (engine, engine.generation, tuple(engine.expiring_foods))
+        if (key != self.planned_for or not self.plan
+                or self.target is not None and grid[self.target] <= FOOD_BASE
+                or self.plan[-1] not in neighbours(head, width, height)
+                or grid[self.plan[-1]] in (SNAKE, OBSTACLE)):
+            self.planned_for = key
+            self.plan, self.target = self.search(engine, head, start + self.budget * SEARCH_SHARE, deadline)
+            if self.plan and not self.is_safe(engine, self.plan, deadline):
+                self.forget()
+
+        if self.plan:
+            cell = self.plan.pop()
+            return MOVES[neighbours(head, width, height).index(cell)]
+        return self.chase_tail(engine, head, deadline)
+
+    def search(self, engine, head, deadline, limit):
+        # Breadth-first search for the nearest food worth eating, preferring
+        # bonus food that can be reached before it expires. Returns (path,
+        # food cell); when the deadline hits first, the path leads to the
+        # searched cell nearest the closest food and the food cell is None.
+        # Building the path stops at `limit` (no path then).
+        width, height = engine.grid_width, engine.grid_height
+        grid = engine.grid
+        clock = time.perf_counter
+        expiring = engine.expiring_foods
+
+        # Ticks left for the bonus that expires last (None without any)
+        bonus_ticks = max(expiring.values()) - engine.tick if expiring else None
+
+        parents = {head: None}
+        frontier = [head]
+        found = None
+        fallback = None
+        depth = 0
+        checked = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for cell in frontier:
+                for neighbour in neighbours(cell, width, height):
+                    if neighbour in parents:
+                        continue
+                    code = grid[neighbour]
+                    if code == SNAKE or code == OBSTACLE:
+                        continue
+                    parents[neighbour] = cell
+                    next_frontier.append(neighbour)
+                    if code > FOOD_BASE:
+                        food = FOOD_BY_CODE[code]
+                        if food == FoodType.BONUS:
+                            # Judged against its own expiry; one that would be
+                            # gone by the time the snake got there is worth
+                            # no more than a speed food
+                            if depth <= expiring[(neighbour % width, neighbour // width)] - engine.tick:
+                                return self.path(parents, neighbour, limit), neighbour
+                            if fallback is None:
+                                fallback = neighbour
+                        elif found is None and FOOD_VALUE[food]:
+                            found = neighbour
+                        elif fallback is None:
+                            fallback = neighbour
+                checked += 1
+                if checked % CLOCK_EVERY == 0 and clock() > deadline:
+                    edge = self.nearest(engine, frontier + next_frontier, limit)
+                    return self.path(parents, edge, limit), None
+            # The nearest food is known; keep going only while a bonus could
+            # still be reached in time
+            if found is not None and (bonus_ticks is None or depth >= bonus_ticks):
+                return self.path(parents, found, limit), found
+            frontier = next_frontier
+        found = found if found is not None else fallback
+        if found is not None:
+            return self.path(parents, found, limit), found
+        return [], None
+
+    def nearest(self, engine, edge, deadline):
+        # Cell on the edge of the search closest (ignoring walls) to the
+        # closest food, valuable food first; the closest of those looked at
+        # before the deadline (the head if none)
+        width, height = engine.grid_width, engine.grid_height
+        head_x, head_y = engine.snake_positions[0]
+        head = head_y * width + head_x
+        foods = ([y * width + x for (x, y), (food, _) in engine.foods.items() if FOOD_VALUE[food]]
+                 or [y * width + x for x, y in engine.foods])
+        if not foods or not edge:
+            return head
+        goal = min(foods, key=lambda cell: wrapped_distance(head, cell, width, height))
+        clock = time.perf_counter
+        best, best_distance = head, None
+        for checked, cell in enumerate(edge, 1):
+            distance = wrapped_distance(cell, goal, width, height)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = cell, distance
+            if checked % CLOCK_EVERY == 0 and clock() > deadline:
+                break
+        return best
+
+    def path(self, parents, cell, deadline):
+        # Cells from the head's neighbour to `cell`, next one last, or none
+        # if the deadline passes first
+        clock = time.perf_counter
+        path = []
+        while parents[cell] is not None:
+            path.append(cell)
+            cell = parents[cell]
+            if len(path) % CLOCK_EVERY == 0 and clock() > deadline:
+                return []
+        return path
+
+    def space(self, engine, cell, tail, deadline, blocked=(), keep=None):
+        # Flood fill from `cell` (bounded by SPACE_CAP and the deadline),
+        # with `blocked` cells off limits and, when `keep` is given, only
+        # the first `keep` body segments in the way. Returns (free cells
+        # found, whether `tail` is next to them).
+        width, height = engine.grid_width, engine.grid_height
+        grid = engine.grid
+        need = min(len(engine.snake_positions), SPACE_CAP)
+        clock = time.perf_counter
+        entered, tick = self.entered, engine.tick
+
+        seen = {cell}
+        stack = [cell]
+        touches_tail = False
+        checked = 0
+        while stack and len(seen) < need:
+            current = stack.pop()
+            for neighbour in neighbours(current, width, height):
+                if neighbour == tail:
+                    touches_tail = True
+                if neighbour in seen or neighbour in blocked:
+                    continue
+                code = grid[neighbour]
+                if code == OBSTACLE:
+                    continue
+                # A segment's index from the head is the ticks since it was the head
+                if code == SNAKE and (keep is None or tick - entered[neighbour] < keep):
+                    continue
+                seen.add(neighbour)
+                stack.append(neighbour)
+            checked += 1
+            if checked % CLOCK_EVERY == 0 and clock() > deadline:
+                # Out of time: don't call a move unsafe without knowing
+                return need, True
+        return len(seen), touches_tail
+
+    def is_safe(self, engine, path, deadline):
+        # Whether the snake still has room after walking `path` (end first):
+        # by then it has grown by one for every food on the path, its body
+        # is the path followed by the first `keep` segments of the current
+        # body, and the rest of the current body has been given up. Nothing
+        # here walks the whole body.
+        grid = engine.grid
+        length = len(engine.snake_positions)
+        new_length = length + sum(grid[cell] > FOOD_BASE for cell in path)
+        keep = max(0, new_length - len(path))
+        if keep:
+            tail_x, tail_y = engine.snake_positions[keep - 1]
+            tail = tail_y * engine.grid_width + tail_x
+        else:
+            tail = path[new_length - 1]
+        found, touches_tail = self.space(engine, path[0], tail, deadline,
+                                         set(path[1:new_length]), keep)
+        return touches_tail or found >= min(length, SPACE_CAP)
+
+    def chase_tail(self, engine, head, deadline):
+        # Fallback: the free neighbour with the most room, preferring ones
+        # that keep the tail in reach and, among those, the one nearest it
+        width, height = engine.grid_width, engine.grid_height
+        grid = engine.grid
+        tail_x, tail_y = engine.snake_positions[-1]
+        tail = tail_y * width + tail_x
+        need = min(len(engine.snake_positions), SPACE_CAP)
+
+        best, best_key = engine.direction, None
+        for move, cell in zip(MOVES, neighbours(head, width, height)):
+            if grid[cell] == SNAKE or grid[cell] == OBSTACLE:
+                continue
+            found, touches_tail = self.space(engine, cell, tail, deadline)
+            safe = touches_tail or found >= need
+            key = (safe, found if not safe else 0, -wrapped_distance(cell, tail, width, height))
+            if best_key is None or key > best_key:
+                best, best_key = move, key
+        return best
+
+    def stats(self):
+        return {
+            "decisions": self.decisions,
+            "mean_us": self.total_time / self.decisions * 1e6 if self.decisions else 0.0,
+            "max_us": self.max_time * 1e6,
+            "over_budget": self.over_budget,
+            "decisions_per_sec": self.decisions / self.total_time if self.total_time else 0.0,
+        }
+
+def play(engine, autopilot, seed, max_ticks):
+    # One headless game; returns the engine when it ends
+    engine.reset(seed)
+    autopilot.forget()
+    while not engine.game_over and engine.tick < max_ticks:
+        engine.step(autopilot.decide(engine))
+    return engine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless autopilot games")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--width", type=int, default=40)
+    parser.add_argument("--height", type=int, default=30)
+    parser.add_argument("--budget-us", type=int, default=DEFAULT_BUDGET_US,
+                        help="time budget per decision in microseconds")
+    parser.add_argument("--max-ticks", type=int, default=20000, help="stop a game after this many ticks")
+    parser.add_argument("--obstacles", action="store_true")
+    parser.add_argument("--frenzy", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from engine import FRENZY_FOOD_COUNT
+
+    engine = SnakeEngine(args.width, args.height, Difficulty.MEDIUM, args.obstacles,
+                         food_count=FRENZY_FOOD_COUNT if args.frenzy else 1)
+    autopilot = Autopilot(args.budget_us)
+    scores = []
+    lengths = []
+    for game in range(args.games):
+        play(engine, autopilot, args.seed + game, args.max_ticks)
+        scores.append(engine.score)
+        lengths.append(len(engine.snake_positions))
+        print(f"game {game + 1}: score {engine.score}, length {len(engine.snake_positions)}, "
+              f"{engine.tick} ticks{'' if engine.game_over else ' (tick limit)'}")
+
+    stats = autopilot.stats()
+    print(f"average score {sum(scores) / len(scores):.1f}, average length {sum(lengths) / len(lengths):.1f}")
+    print(f"{stats['decisions']:,} decisions at {stats['decisions_per_sec']:,.0f}/sec: "
+          f"mean {stats['mean_us']:.1f} us, max {stats['max_us']:.1f} us, "
+          f"{stats['over_budget']} over the {args.budget_us} us budget")
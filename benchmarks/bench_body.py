@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import SnakeEngine, Direction, FoodType
+
+# Grow a snake until it fills a large board. With O(1) movement and
+# collision checks the cost per tick stays flat as the snake gets longer.
+BOARD_SIZE = 200
+REPORT_EVERY = 4000
+
+def cycle_direction(x, y, width, height, shift=0):
+    # Hamiltonian cycle for an even board height: rows are swept in a
+    # boustrophedon over columns 1..width-1 and column 0 leads back up.
+    # The board wraps around, so the cycle can start on any row (shift).
+    y = (y - shift) % height
+    if x == 0:
+        return Direction.RIGHT if y == 0 else Direction.UP
+    if y % 2 == 0:
+        return Direction.RIGHT if x < width - 1 else Direction.DOWN
+    if x > 1 or y == height - 1:
+        return Direction.LEFT
+    return Direction.DOWN
+
+def fill_board(size):
+    engine = SnakeEngine(size, size, special_food_enabled=False)
+    engine.reset(seed=1)
+    target = size * size - 1
+    rows = []
+    start = block_start = time.perf_counter()
+    while len(engine.snake_positions) < target:
+        head_x, head_y = engine.snake_positions[0]
+        direction = cycle_direction(head_x, head_y, size, size)
+        dx, dy = direction.value
+        # Feed the snake on every tick so it grows by one cell; the random
+        # food spawned after each meal is dropped so only the body grows
+        next_pos = ((head_x + dx) % size, (head_y + dy) % size)
+        for pos in list(engine.foods):
+            engine.remove_food(pos)
+        engine.place_food(next_pos, FoodType.REGULAR)
+        engine.step(direction)
+        if engine.game_over:
+            raise RuntimeError(f"snake crashed at length {len(engine.snake_positions)}")
+
+        length = len(engine.snake_positions)
+        if length % REPORT_EVERY == 0:
+            now = time.perf_counter()
+            rows.append((length, (now - block_start) / REPORT_EVERY * 1e6))
+            block_start = now
+    return time.perf_counter() - start, rows
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else BOARD_SIZE
+    total, rows = fill_board(size)
+    print(f"Filled a {size}x{size} board in {total:.2f}s")
+    print(f"{'length':>8}  {'us/tick':>8}")
+    for length, micros in rows:
+        print(f"{length:>8}  {micros:>8.2f}")
@@ -0,0 +1,174 @@
+import os
+import random
+import sys
+import time
+
+# Run pygame without a real window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from engine import SnakeEngine, Direction, Difficulty, FoodType, OPPOSITE, GRID_WIDTH, GRID_HEIGHT
+
+STEPS = 200000
+TURN_CHANCE = 0.1
+DIRECTIONS = list(Direction)
+
+def random_policy(seed):
+    # Same turning pattern for both contenders
+    rng = random.Random(seed)
+    def policy():
+        if rng.random() < TURN_CHANCE:
+            return rng.choice(DIRECTIONS)
+        return None
+    return policy
+
+class LegacyGame:
+    # SnakeGame's rules as they were before the engine split (reset_game,
+    # add_food and update, sounds left out), frozen here as the baseline.
+    # Lists for the body, food and obstacles; timers on pygame's clock.
+    def __init__(self):
+        self.difficulty = Difficulty.MEDIUM
+        self.obstacles_enabled = False
+        self.special_food_enabled = True
+        self.snake_positions = []
+        self.foods = []
+        self.obstacles = []
+        self.high_score = 0
+
+    def reset_game(self):
+        center_x, center_y = GRID_WIDTH // 2, GRID_HEIGHT // 2
+        self.snake_positions = [(center_x, center_y)]
+        for i in range(1, 3):
+            self.snake_positions.append((center_x - i, center_y))
+        self.direction = Direction.RIGHT
+        self.next_direction = Direction.RIGHT
+        self.score = 0
+        self.game_over = False
+        self.foods = []
+        self.add_food(FoodType.REGULAR)
+        self.speed_modifier = 1.0
+        self.speed_effect_time = 0
+        self.obstacles = []
+
+    def add_food(self, food_type=None):
+        if food_type is None:
+            if self.special_food_enabled and random.random() < 0.2:
+                food_type = random.choice([FoodType.BONUS, FoodType.SPEED, FoodType.SLOW])
+            else:
+                food_type = FoodType.REGULAR
+        attempts = 0
+        while attempts < 100:
+            pos = (random.randint(0, GRID_WIDTH-1), random.randint(0, GRID_HEIGHT-1))
+            if pos not in self.snake_positions and pos not in self.obstacles and pos not in [f[0] for f in self.foods]:
+                timer = 0
+                if food_type == FoodType.BONUS:
+                    timer = pygame.time.get_ticks() + 5000
+                self.foods.append((pos, food_type, timer))
+                break
+            attempts += 1
+
+    def queue_turn(self, direction):
+        # What handle_game_keys did with an arrow key
+        if direction != OPPOSITE[self.direction]:
+            self.next_direction = direction
+
+    def update(self):
+        if self.game_over:
+            return
+        self.direction = self.next_direction
+        head_x, head_y = self.snake_positions[0]
+        dx, dy = self.direction.value
+        new_head = ((head_x + dx) % GRID_WIDTH, (head_y + dy) % GRID_HEIGHT)
+        if new_head in self.obstacles:
+            self.game_over = True
+            return
+        if new_head in self.snake_positions:
+            self.game_over = True
+            return
+        self.snake_positions.insert(0, new_head)
+        ate_food = False
+        for i, (food_pos, food_type, timer) in enumerate(self.foods):
+            if new_head == food_pos:
+                self.foods.pop(i)
+                if food_type == FoodType.REGULAR:
+                    self.score += 10
+                elif food_type == FoodType.BONUS:
+                    self.score += 50
+                elif food_type == FoodType.SPEED:
+                    self.speed_modifier = 1.5
+                    self.speed_effect_time = pygame.time.get_ticks() + 5000
+                elif food_type == FoodType.SLOW:
+                    self.speed_modifier = 0.7
+                    self.speed_effect_time = pygame.time.get_ticks() + 5000
+                ate_food = True
+                self.add_food()
+                break
+        if not ate_food:
+            self.snake_positions.pop()
+        if self.score > self.high_score:
+            self.high_score = self.score
+        current_time = pygame.time.get_ticks()
+        self.foods = [(pos, type, timer) for pos, type, timer in self.foods if timer == 0 or timer > current_time]
+        if self.special_food_enabled and random.random() < 0.005 and not any(f[1] == FoodType.BONUS for f in self.foods):
+            self.add_food(FoodType.BONUS)
+        if self.speed_effect_time > 0 and current_time > self.speed_effect_time:
+            self.speed_modifier = 1.0
+            self.speed_effect_time = 0
+
+def bench_engine(steps):
+    engine = SnakeEngine()
+    engine.reset(seed=1)
+    policy = random_policy(1)
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.step(policy())
+        if engine.game_over:
+            engine.reset()
+    return steps / (time.perf_counter() - start)
+
+def bench_legacy(steps):
+    pygame.init()  # for pygame.time.get_ticks
+    random.seed(1)
+    game = LegacyGame()
+    game.reset_game()
+    policy = random_policy(1)
+    start = time.perf_counter()
+    for _ in range(steps):
+        direction = policy()
+        if direction is not None:
+            game.queue_turn(direction)
+        game.update()
+        if game.game_over:
+            game.reset_game()
+    return steps / (time.perf_counter() - start)
+
+def bench_pygame_class(steps):
+    from SnakeGame import SnakeGame
+
+    game = SnakeGame()
+    game.game_state = "PLAYING"
+    game.reset_game()
+    policy = random_policy(1)
+    start = time.perf_counter()
+    for _ in range(steps):
+        direction = policy()
+        if direction is not None:
+            game.queue_turn(direction)
+        game.update()
+        if game.engine.game_over:
+            game.reset_game()
+    return steps / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    engine_rate = bench_engine(steps)
+    game_rate = bench_pygame_class(steps)
+    legacy_rate = bench_legacy(steps)
+    print(f"SnakeEngine.step:  {engine_rate:12,.0f} steps/sec")
+    print(f"SnakeGame.update:  {game_rate:12,.0f} steps/sec (dummy SDL driver)")
+    print(f"legacy update:     {legacy_rate:12,.0f} steps/sec (pre-split rules, dummy SDL driver)")
+    print(f"speedup:           {engine_rate / legacy_rate:12.2f}x")
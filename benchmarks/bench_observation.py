@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import SnakeEngine, FRENZY_FOOD_COUNT
+from observation import BoardObservation
+from vec_env import ACTIONS
+
+# Cost per step of keeping the observation planes current: updated in place
+# from the engine's cell watchers, against rebuilding them from the grid
+# after every step. Also times snapshot() and restore().
+
+STEPS = 5000
+GRID_SIZES = [(40, 30), (200, 150), (1000, 1000)]
+TURN_CHANCE = 0.1
+
+def bench_steps(width, height, steps, rebuild_every_step):
+    engine = SnakeEngine(width, height, food_count=FRENZY_FOOD_COUNT)
+    engine.reset(seed=1)
+    observation = BoardObservation(engine)
+    rng = np.random.default_rng(1)
+    turns = rng.random(steps) < TURN_CHANCE
+    picks = rng.integers(0, len(ACTIONS), size=steps)
+    start = time.perf_counter()
+    for t in range(steps):
+        engine.step(ACTIONS[picks[t]] if turns[t] else None)
+        if engine.game_over:
+            engine.reset()
+        if rebuild_every_step:
+            observation.rebuild()
+        observation.view()
+    return (time.perf_counter() - start) / steps
+
+def bench_snapshot(steps):
+    engine = SnakeEngine()
+    engine.reset(seed=1)
+    for _ in range(20):
+        engine.step()
+    state = engine.snapshot()
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.snapshot()
+    snapshot_time = (time.perf_counter() - start) / steps
+    start = time.perf_counter()
+    for _ in range(steps):
+        engine.restore(state)
+    return snapshot_time, (time.perf_counter() - start) / steps
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    print(f"{'board':>10} {'incremental':>14} {'rebuilt':>14}  (per step, with frenzy food)")
+    for width, height in GRID_SIZES:
+        incremental = bench_steps(width, height, steps, False)
+        rebuilt = bench_steps(width, height, max(20, steps * 1200 // (width * height)), True)
+        print(f"{width:>4}x{height:<5} {incremental * 1e6:>11.1f} us {rebuilt * 1e6:>11.1f} us")
+    snapshot_time, restore_time = bench_snapshot(steps)
+    print(f"snapshot {snapshot_time * 1e6:.1f} us, restore {restore_time * 1e6:.1f} us (40x30)")
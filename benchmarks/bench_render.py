@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+
+# Run pygame without a real window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from bench_body import cycle_direction
+from engine import SnakeEngine, Direction, FoodType
+from renderer import BoardRenderer
+
+# Frame time of a full repaint versus the dirty-rect renderer at several
+# snake lengths on the default 40x30 board
+CELL_SIZE = 20
+LENGTHS = [3, 100, 400, 1000]
+FRAMES = 300
+# Frame time with the camera following the snake on ever larger boards; it
+# should not grow with the board
+WORLD_SIZES = [(40, 30), (400, 300), (4000, 3000)]
+TICKS_PER_FRAME = 0.2  # 12 ticks/sec at 60 fps
+
+def make_engine(length):
+    engine = SnakeEngine(special_food_enabled=False, food_count=0)
+    engine.reset(seed=1)
+    while len(engine.snake_positions) < length:
+        step_along_cycle(engine, grow=True)
+        if engine.game_over:
+            raise RuntimeError(f"snake crashed at length {len(engine.snake_positions)}")
+    for pos in list(engine.foods):
+        engine.remove_food(pos)
+    # A few foods off to the side so food animation is part of the frame
+    for pos in [(1, 1), (5, 7), (30, 20)]:
+        if engine.cell_at(pos) == 0:
+            engine.place_food(pos, FoodType.REGULAR)
+    return engine
+
+def step_along_cycle(engine, grow=False):
+    head_x, head_y = engine.snake_positions[0]
+    # Shift the cycle so the starting row is swept left to right
+    shift = (engine.grid_height // 2) % 2
+    direction = cycle_direction(head_x, head_y, engine.grid_width, engine.grid_height, shift)
+    if grow:
+        dx, dy = direction.value
+        next_pos = ((head_x + dx) % engine.grid_width, (head_y + dy) % engine.grid_height)
+        if engine.cell_at(next_pos) == 0:
+            engine.place_food(next_pos, FoodType.REGULAR)
+    engine.step(direction)
+
+def draw_legacy(screen, renderer, engine, now):
+    # What draw_game used to do: tile every cell, then draw every obstacle,
+    # food and snake segment, then update the whole display
+    size = CELL_SIZE
+    for x in range(0, engine.grid_width * size, size):
+        for y in range(0, engine.grid_height * size, size):
+            screen.blit(renderer.sprites.tile, (x, y))
+    for cell in engine.obstacle_cells():
+        y, x = divmod(cell, engine.grid_width)
+        pygame.draw.rect(screen, (100, 100, 100), (x * size, y * size, size, size))
+    head_x, head_y = engine.snake_positions[0]
+    head = head_y * engine.grid_width + head_x
+    for x, y in list(engine.snake_positions) + list(engine.foods):
+        renderer.draw_cell(engine, y * engine.grid_width + x, head, now)
+    pygame.display.update()
+
+def draw_full(screen, renderer, engine, now):
+    renderer.draw(engine, now, full=True)
+    pygame.display.update()
+
+def draw_dirty(screen, renderer, engine, now):
+    pygame.display.update(renderer.draw(engine, now))
+
+def bench(mode, length, frames):
+    screen = pygame.display.set_mode((40 * CELL_SIZE, 30 * CELL_SIZE))
+    engine = make_engine(length)
+    renderer = BoardRenderer(screen, CELL_SIZE)
+    renderer.draw(engine, 0)
+    total = 0.0
+    for frame in range(frames):
+        step_along_cycle(engine)
+        start = time.perf_counter()
+        mode(screen, renderer, engine, frame * 16)
+        total += time.perf_counter() - start
+    return total / frames * 1000
+
+def bench_world(width, height, frames):
+    screen = pygame.display.set_mode((40 * CELL_SIZE, 30 * CELL_SIZE))
+    engine = SnakeEngine(width, height, obstacles_enabled=True, food_count=50)
+    engine.reset(seed=1)
+    renderer = BoardRenderer(screen, CELL_SIZE)
+    renderer.draw(engine, 0)
+    directions = [Direction.RIGHT, Direction.DOWN]
+    total = 0.0
+    ticks = 0.0
+    for frame in range(frames):
+        ticks += TICKS_PER_FRAME
+        while ticks >= 1:
+            ticks -= 1
+            # Head right and down in a staircase so the camera scrolls both ways
+            engine.step(directions[(engine.tick // 8) % 2])
+            if engine.game_over:
+                engine.reset(seed=frame)
+        start = time.perf_counter()
+        pygame.display.update(renderer.draw(engine, frame * 16))
+        total += time.perf_counter() - start
+    return total / frames * 1000
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    pygame.display.init()
+    print(f"{'length':>8}  {'legacy ms':>10}  {'full ms':>10}  {'dirty ms':>10}")
+    for length in LENGTHS:
+        legacy = bench(draw_legacy, length, frames)
+        full = bench(draw_full, length, frames)
+        dirty = bench(draw_dirty, length, frames)
+        print(f"{length:>8}  {legacy:>10.3f}  {full:>10.3f}  {dirty:>10.3f}")
+
+    print()
+    print(f"{'board':>12}  {'follow ms':>10}")
+    for width, height in WORLD_SIZES:
+        print(f"{f'{width}x{height}':>12}  {bench_world(width, height, frames * 4):>10.3f}")
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Run pygame without a real window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+
+from bench_body import cycle_direction
+from engine import SnakeEngine, FoodType, EMPTY, OBSTACLE, BONUS_FOOD_SECONDS
+from server import percentile
+
+# Per-call latency of the hot operations, as p50/p95/p99 in microseconds.
+# Results can be saved as JSON and compared against an earlier run:
+#
+#   python benchmarks/bench_suite.py --output before.json
+#   ... change something ...
+#   python benchmarks/bench_suite.py --compare before.json
+
+LENGTHS = [3, 100, 1000]
+GRID_SIZES = [(40, 30), (200, 150), (2000, 1500)]
+OBSTACLE_DENSITIES = [0.0, 0.1, 0.3]
+# Bonus foods waiting to expire during engine.step
+PENDING_TIMERS = [10, 3000]
+SAMPLES = 2000
+DRAW_SAMPLES = 300
+STARTUP_SAMPLES = 5
+WARMUP = 20
+# A p50 or p95 this much slower than the baseline counts as a regression
+REGRESSION_THRESHOLD = 0.15
+
+def summarize(samples_ns):
+    ordered = sorted(samples_ns)
+    return {
+        "n": len(ordered),
+        "p50": percentile(ordered, 0.50) / 1000,
+        "p95": percentile(ordered, 0.95) / 1000,
+        "p99": percentile(ordered, 0.99) / 1000,
+    }
+
+def measure(samples, prepare, operation):
+    # Time `operation` alone; `prepare` runs untimed before every call
+    clock = time.perf_counter_ns
+    times = []
+    for i in range(WARMUP + samples):
+        prepare()
+        start = clock()
+        operation()
+        elapsed = clock() - start
+        if i >= WARMUP:
+            times.append(elapsed)
+    return summarize(times)
+
+def step_along_cycle(engine, grow=False):
+    head_x, head_y = engine.snake_positions[0]
+    # Shift the cycle so the starting row is swept left to right
+    shift = (engine.grid_height // 2) % 2
+    direction = cycle_direction(head_x, head_y, engine.grid_width, engine.grid_height, shift)
+    if grow:
+        dx, dy = direction.value
+        next_pos = ((head_x + dx) % engine.grid_width, (head_y + dy) % engine.grid_height)
+        if engine.cell_at(next_pos) == EMPTY:
+            engine.place_food(next_pos, FoodType.REGULAR)
+    engine.step(direction)
+    return direction
+
+def grown_engine(width, height, length):
+    # A snake of the given length laid along a Hamiltonian cycle, so it can
+    # keep moving for as long as the benchmark needs
+    engine = SnakeEngine(width, height, special_food_enabled=False)
+    engine.reset(seed=1)
+    while len(engine.snake_positions) < length:
+        step_along_cycle(engine, grow=True)
+        if engine.game_over:
+            raise RuntimeError(f"snake crashed at length {len(engine.snake_positions)}")
+    # Every meal spawned another food; keep just one, as in a normal game
+    for pos in list(engine.foods):
+        engine.remove_food(pos)
+    engine.add_food(FoodType.REGULAR)
+    return engine
+
+def add_obstacles(engine, density):
+    # Cover a fraction of the free cells with obstacles
+    for _ in range(int(engine.free_count * density)):
+        engine.occupy(engine.random_free_cell(), OBSTACLE)
+
+def bench_update(game, width, height, length, samples):
+    game.engine = grown_engine(width, height, length)
+    game.game_state = "PLAYING"
+    game.recorder.start(game.engine)
+
+    def prepare():
+        engine = game.engine
+        if engine.game_over or len(engine.snake_positions) >= engine.grid_width * engine.grid_height - 1:
+            game.engine = grown_engine(width, height, length)
+            game.recorder.start(game.engine)
+            engine = game.engine
+        head_x, head_y = engine.snake_positions[0]
+        shift = (height // 2) % 2
+        game.queue_turn(cycle_direction(head_x, head_y, width, height, shift))
+
+    return measure(samples, prepare, game.update)
+
+def bench_add_food(width, height, density, samples):
+    engine = SnakeEngine(width, height)
+    engine.reset(seed=1)
+    add_obstacles(engine, density)
+    placed = []
+
+    def prepare():
+        while placed:
+            pos = placed.pop()
+            if pos is not None:
+                engine.remove_food(pos)
+
+    def operation():
+        placed.append(engine.add_food())
+
+    return measure(samples, prepare, operation)
+
+def bench_step_with_timers(pending, samples):
+    # A steady `pending` bonus foods on the board: as many are added every
+    # tick as expire
+    engine = SnakeEngine(2000, 1500, special_food_enabled=False)
+    engine.reset(seed=1)
+    lifetime = engine.seconds_to_ticks(BONUS_FOOD_SECONDS)
+    per_tick = max(1, pending // lifetime)
+
+    def prepare():
+        for _ in range(per_tick):
+            engine.add_food(FoodType.BONUS)
+
+    for _ in range(lifetime):
+        prepare()
+        engine.step()
+    return measure(samples, prepare, engine.step)
+
+def bench_generate_obstacles(width, height, samples):
+    # The pages overwrite the whole board, so every call starts from scratch
+    engine = SnakeEngine(width, height)
+    engine.reset(seed=1)
+    return measure(samples, lambda: None, engine.generate_obstacles)
+
+def bench_draw_game(game, length, samples):
+    from SnakeGame import GRID_WIDTH, GRID_HEIGHT
+
+    game.engine = grown_engine(GRID_WIDTH, GRID_HEIGHT, length)
+    game.game_state = "PLAYING"
+    game.paused = False
+    game.renderer.invalidate()
+    game.draw_game()
+
+    def prepare():
+        step_along_cycle(game.engine)
+        if game.engine.game_over:
+            game.engine = grown_engine(GRID_WIDTH, GRID_HEIGHT, length)
+
+    return measure(samples, prepare, game.draw_game)
+
+def bench_draw_menu(game, samples):
+    game.game_state = "MENU"
+    return measure(samples, lambda: None, game.draw_menu)
+
+def bench_startup(samples):
+    # Launch to first frame, from fresh processes (the game prints it).
+    # They run in a scratch directory, so the score store they open is
+    # not the one in the repository.
+    times = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for _ in range(samples):
+            output = subprocess.run([sys.executable, os.path.join(ROOT, "SnakeGame.py"), "--startup-time"],
+                                    cwd=scratch, capture_output=True, text=True, check=True).stdout
+            milliseconds = float(output.rsplit("First frame after ", 1)[1].split()[0])
+            times.append(milliseconds * 1e6)
+    return summarize(times)
+
+def run_suite(samples, draw_samples, startup_samples):
+    from SnakeGame import SnakeGame
+
+    game = SnakeGame()
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        print(f"{name:<44} {result['p50']:>10.2f} {result['p95']:>10.2f} {result['p99']:>10.2f}")
+
+    print(f"{'operation':<44} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10}")
+    for width, height in GRID_SIZES:
+        for length in LENGTHS:
+            record(f"update[grid={width}x{height},length={length}]",
+                   bench_update(game, width, height, length, samples))
+    for width, height in GRID_SIZES:
+        for density in OBSTACLE_DENSITIES:
+            record(f"add_food[grid={width}x{height},obstacles={density}]",
+                   bench_add_food(width, height, density, samples))
+    for pending in PENDING_TIMERS:
+        record(f"step[pending_timers={pending}]", bench_step_with_timers(pending, samples))
+    for width, height in GRID_SIZES:
+        # Whole-board work, so fewer samples on the big boards
+        record(f"generate_obstacles[grid={width}x{height}]",
+               bench_generate_obstacles(width, height, max(20, samples * 1200 // (width * height))))
+    for length in LENGTHS:
+        record(f"draw_game[length={length}]", bench_draw_game(game, length, draw_samples))
+    record("draw_menu", bench_draw_menu(game, draw_samples))
+    record("startup", bench_startup(startup_samples))
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+    }
+
+def compare(results, baseline, threshold):
+    # Print the change against a baseline run; returns the regressed operations
+    regressions = []
+    print()
+    print(f"{'operation':<44} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        changes = {key: result[key] / before[key] - 1 if before[key] else 0.0
+                   for key in ("p50", "p95", "p99")}
+        slower = changes["p50"] > threshold or changes["p95"] > threshold
+        if slower:
+            regressions.append(name)
+        print(f"{name:<44} {changes['p50']:>+8.0%} {changes['p95']:>+8.0%} {changes['p99']:>+8.0%}"
+              f"{'  REGRESSION' if slower else ''}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency benchmarks for the game's hot paths")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against an earlier JSON result")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown (fraction) reported as a regression")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--draw-samples", type=int, default=DRAW_SAMPLES)
+    parser.add_argument("--startup-samples", type=int, default=STARTUP_SAMPLES)
+    args = parser.parse_args()
+
+    results = run_suite(args.samples, args.draw_samples, args.startup_samples)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
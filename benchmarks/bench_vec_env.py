@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import SnakeEngine
+from vec_env import VecSnakeEnv, ACTIONS
+
+STEPS = 500
+ENV_COUNTS = [1, 64, 1024, 4096]
+TURN_CHANCE = 0.1
+
+def bench_vec(num_envs, steps, obstacles_enabled=False):
+    env = VecSnakeEnv(num_envs, obstacles_enabled=obstacles_enabled, seed=1)
+    rng = np.random.default_rng(1)
+    # Pre-draw the actions so only stepping is timed
+    actions = np.where(rng.random((steps, num_envs)) < TURN_CHANCE,
+                       rng.integers(0, len(ACTIONS), size=(steps, num_envs)), -1)
+    start = time.perf_counter()
+    for t in range(steps):
+        env.step(actions[t])
+    return steps * num_envs / (time.perf_counter() - start)
+
+def bench_scalar(steps):
+    engine = SnakeEngine()
+    engine.reset(seed=1)
+    rng = np.random.default_rng(1)
+    turns = rng.random(steps) < TURN_CHANCE
+    picks = rng.integers(0, len(ACTIONS), size=steps)
+    start = time.perf_counter()
+    for t in range(steps):
+        engine.step(ACTIONS[picks[t]] if turns[t] else None)
+        if engine.game_over:
+            engine.reset()
+    return steps / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    print(f"SnakeEngine (1 game):        {bench_scalar(steps * 100):12,.0f} steps/sec")
+    for num_envs in ENV_COUNTS:
+        print(f"VecSnakeEnv ({num_envs:5d} games):  {bench_vec(num_envs, steps):12,.0f} steps/sec")
+    print(f"VecSnakeEnv (1024, obstacles): {bench_vec(1024, steps, True):10,.0f} steps/sec")
@@ -0,0 +1,203 @@
+import argparse
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+import pygame
+
+# Session capture. After each frame is on screen the game copies the
+# screen's raw pixels (a plain memory copy, well under a millisecond) and
+# hands them to a writer thread through a bounded queue; the thread
+# compresses them (zlib lets go of the GIL while it works) and appends them
+# to a capture file. When the writer falls behind and the queue is full,
+# frames are dropped rather than making the game wait, and counted.
+#
+# A capture file is a header with the screen's pixel format, then one
+# record per frame: its time since the capture started, the number of
+# frames dropped so far, and the zlib-compressed pixels. Closing it adds a
+# record with no pixels holding the final drop count. Export one with
+#
+#   python capture.py captures/<file>.snkv --png frames/
+#   python capture.py captures/<file>.snkv --video clip.mp4   (needs ffmpeg)
+
+MAGIC = b"SNKV"
+VERSION = 2
+# Versions read_frames() and stats() understand (1 had no closing record)
+READ_VERSIONS = (1, 2)
+# magic, version, width, height, bits per pixel, pitch, R, G, B, A masks
+HEADER = struct.Struct("<4sBHHBHIIII")
+# time (seconds), frames dropped so far, compressed length (0 for the
+# closing record)
+FRAME = struct.Struct("<dII")
+
+QUEUE_FRAMES = 8  # about 15 MB at 800x600
+COMPRESS_LEVEL = 1
+VIDEO_FPS = 60
+
+class CaptureError(Exception):
+    pass
+
+class FrameCapture:
+    def __init__(self, path, surface, queue_frames=QUEUE_FRAMES):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, surface.get_width(), surface.get_height(),
+                                    surface.get_bitsize(), surface.get_pitch(), *surface.get_masks()))
+        self.queue = queue.Queue(queue_frames)
+        self.started = time.perf_counter()
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self.writer = threading.Thread(target=self.write_frames, daemon=True)
+        self.writer.start()
+
+    def capture(self, surface):
+        # Called by the game loop after display.update; never blocks
+        if self.queue.full() or self.error is not None:
+            self.dropped += 1
+            return
+        self.queue.put_nowait((time.perf_counter() - self.started, self.dropped,
+                               surface.get_buffer().raw))
+        self.captured += 1
+
+    def write_frames(self):
+        # Runs on the writer thread until close() sends None
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            elapsed, dropped, pixels = frame
+            data = zlib.compress(pixels, COMPRESS_LEVEL)
+            try:
+                self.file.write(FRAME.pack(elapsed, dropped, len(data)))
+                self.file.write(data)
+            except OSError as e:
+                self.error = e
+                continue
+            self.written += 1
+
+    def close(self):
+        # Waits for the queued frames to be written, then records the frames
+        # dropped since the last of them
+        self.queue.put(None)
+        self.writer.join()
+        if self.error is None:
+            try:
+                self.file.write(FRAME.pack(time.perf_counter() - self.started, self.dropped, 0))
+            except OSError as e:
+                self.error = e
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+def read_frames(path):
+    # Yields (time, surface) for every frame; the surface is reused, so
+    # use it before taking the next one
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise CaptureError("file too short")
+        magic, version, width, height, bitsize, pitch, *masks = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise CaptureError("not a capture file")
+        if version not in READ_VERSIONS:
+            raise CaptureError(f"unsupported capture version {version}")
+        surface = pygame.Surface((width, height), 0, bitsize, masks)
+        if surface.get_pitch() != pitch:
+            raise CaptureError("pixel layout not supported here")
+        buffer = surface.get_buffer()
+        while True:
+            record = f.read(FRAME.size)
+            if len(record) < FRAME.size:
+                break  # the end, or a capture cut short
+            elapsed, _, length = FRAME.unpack(record)
+            if not length:
+                break  # the closing record
+            data = f.read(length)
+            if len(data) < length:
+                break
+            buffer.write(zlib.decompress(data))
+            yield elapsed, surface
+
+def stats(path):
+    # (frames, dropped, seconds) without decompressing anything. The drop
+    # count comes from the closing record when there is one, so it includes
+    # frames dropped after the last one written.
+    frames = dropped = 0
+    elapsed = 0.0
+    with open(path, "rb") as f:
+        f.seek(HEADER.size)
+        while True:
+            record = f.read(FRAME.size)
+            if len(record) < FRAME.size:
+                break
+            frame_time, dropped, length = FRAME.unpack(record)
+            if not length:
+                break
+            elapsed = frame_time
+            f.seek(length, os.SEEK_CUR)
+            frames += 1
+    return frames, dropped, elapsed
+
+def export_png(path, directory):
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for count, (_, surface) in enumerate(read_frames(path), 1):
+        pygame.image.save(surface, os.path.join(directory, f"frame_{count:06d}.png"))
+    return count
+
+def export_video(path, output, fps=VIDEO_FPS):
+    # Constant frame rate video through ffmpeg; each captured frame is held
+    # until the next one is due, so dropped frames don't speed it up
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise CaptureError("ffmpeg not found (use --png to export frames instead)")
+    encoder = None
+    count = 0
+    for elapsed, surface in read_frames(path):
+        if encoder is None:
+            width, height = surface.get_size()
+            encoder = subprocess.Popen(
+                [ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                 "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                 "-pix_fmt", "yuv420p", output], stdin=subprocess.PIPE)
+        pixels = pygame.image.tobytes(surface, "RGB")
+        # Repeat this frame until the video catches up with its time
+        while count == 0 or count < round(elapsed * fps):
+            encoder.stdin.write(pixels)
+            count += 1
+    if encoder is None:
+        raise CaptureError("no frames in capture")
+    encoder.stdin.close()
+    if encoder.wait() != 0:
+        raise CaptureError("ffmpeg failed")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a captured session")
+    parser.add_argument("capture", help="capture file (.snkv)")
+    parser.add_argument("--png", metavar="DIR", help="write every frame as a PNG here")
+    parser.add_argument("--video", metavar="FILE", help="encode a video with ffmpeg")
+    parser.add_argument("--fps", type=int, default=VIDEO_FPS, help="video frame rate")
+    args = parser.parse_args()
+
+    try:
+        frames, dropped, seconds = stats(args.capture)
+        print(f"{frames} frames over {seconds:.1f} s ({frames / max(seconds, 1e-9):.1f} fps), "
+              f"{dropped} dropped while capturing")
+        if args.png:
+            print(f"{export_png(args.capture, args.png)} frames written to {args.png}")
+        if args.video:
+            print(f"{export_video(args.capture, args.video, args.fps)} video frames written to {args.video}")
+    except (CaptureError, OSError) as e:
+        print(f"Could not export capture: {e}")
+        sys.exit(1)
@@ -0,0 +1,14 @@
+# Colors
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+DARK_GRAY = (40, 40, 40)
+GREEN = (46, 204, 113)
+LIGHT_GREEN = (88, 214, 141)
+DARK_GREEN = (39, 174, 96)
+RED = (231, 76, 60)
+GOLD = (241, 196, 15)
+BLUE = (52, 152, 219)
+LIGHT_BLUE = (133, 193, 233)
+PURPLE = (155, 89, 182)
+OBSTACLE_GRAY = (100, 100, 100)
+OBSTACLE_LINE = (70, 70, 70)
@@ -0,0 +1,563 @@
+import random
+from bisect import bisect_right
+from collections import deque
+from enum import Enum
+from itertools import accumulate
+
+from timers import TimerWheel
+
+# Headless game rules. Nothing in this module touches pygame, so it can be
+# imported by bots, benchmarks and batch runners without opening a window.
+
+# Default board size (matches the 800x600 window with 20px cells)
+GRID_WIDTH = 40
+GRID_HEIGHT = 30
+
+# Durations are counted in simulation ticks. A "second" is one second at the
+# base tick rate of the selected difficulty.
+BONUS_FOOD_SECONDS = 5
+SPEED_EFFECT_SECONDS = 5
+
+# Cell codes stored in the occupancy grid
+EMPTY = 0
+SNAKE = 1
+OBSTACLE = 2
+FOOD_BASE = 2  # food cell code is FOOD_BASE + FoodType.value
+
+# Foods kept alive at once in frenzy mode
+FRENZY_FOOD_COUNT = 150
+# Chance a new food is a special one, and chance per tick of a bonus food
+# turning up (when none is on the board)
+SPECIAL_FOOD_CHANCE = 0.2
+BONUS_CHANCE = 0.005
+
+# The board is split into square chunks of CHUNK_SIZE cells for free-space
+# bookkeeping (and for drawing, see renderer.py)
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+# Random cells tried before falling back to a walk over the chunk counts
+FREE_CELL_PROBES = 8
+
+# Obstacles come in clusters: 5-10 per screen's worth of board, each a
+# square of 3, 5 or 7 cells about 60% filled. Clusters are stamped from a
+# fixed library of shapes and keep one empty cell between each other, so no
+# group of obstacles can ever close off a region.
+CLUSTERS_PER_SCREEN = (5, 10)
+CLUSTER_FILL = 0.6
+CLUSTER_SHAPES = 32  # shapes per cluster size
+CLUSTER_SEED = 0
+# The board is tiled with pages of clusters; this many distinct pages are
+# generated per game and reused (mirrored) across bigger boards
+PAGE_SIZE = 4 * CHUNK_SIZE
+PAGE_VARIETY = 16
+# Cells kept clear ahead of the spawn point, so the snake can't start boxed in
+SPAWN_CLEARANCE = 8
+
+# Direction enum
+class Direction(Enum):
+    UP = (0, -1)
+    DOWN = (0, 1)
+    LEFT = (-1, 0)
+    RIGHT = (1, 0)
+
+OPPOSITE = {
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+    Direction.LEFT: Direction.RIGHT,
+    Direction.RIGHT: Direction.LEFT,
+}
+
+# Game difficulty enum (value is the base tick rate in ticks per second)
+class Difficulty(Enum):
+    EASY = 8
+    MEDIUM = 12
+    HARD = 16
+
+# Food types
+class FoodType(Enum):
+    REGULAR = 1  # Regular food (red)
+    BONUS = 2    # Bonus food (gold) - worth more points but disappears quickly
+    SPEED = 3    # Speed food (blue) - temporarily increases snake speed
+    SLOW = 4     # Slow food (purple) - temporarily decreases snake speed
+
+FOOD_BY_CODE = {FOOD_BASE + food_type.value: food_type for food_type in FoodType}
+SPECIAL_FOODS = [FoodType.BONUS, FoodType.SPEED, FoodType.SLOW]
+
+def make_cluster(rng, radius):
+    # One cluster shape as rows of cell codes. Empty cells it closes off
+    # from the outside (found with a flood fill around it) are filled in.
+    side = 2 * radius + 1
+    rows = [[OBSTACLE if rng.random() < CLUSTER_FILL else EMPTY for _ in range(side)]
+            for _ in range(side)]
+    reached = {(-1, -1)}
+    stack = [(-1, -1)]
+    while stack:
+        x, y = stack.pop()
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if -1 <= nx <= side and -1 <= ny <= side and (nx, ny) not in reached:
+                if not (0 <= nx < side and 0 <= ny < side) or rows[ny][nx] == EMPTY:
+                    reached.add((nx, ny))
+                    stack.append((nx, ny))
+    for y in range(side):
+        for x in range(side):
+            if (x, y) not in reached:
+                rows[y][x] = OBSTACLE
+    return [bytes(row) for row in rows]
+
+# Cluster shapes indexed by radius - 1. Built from a fixed seed, so a game's
+# seed alone still decides its layout.
+_cluster_rng = random.Random(CLUSTER_SEED)
+CLUSTERS = [[make_cluster(_cluster_rng, radius) for _ in range(CLUSTER_SHAPES)]
+            for radius in (1, 2, 3)]
+
+def spawn_corridor(grid_width, grid_height):
+    # (x0, y0, x1, y1), end-exclusive: the snake's spawn cells plus the room
+    # ahead of them, where no obstacle may be placed. Clipped to the board.
+    center_x, center_y = grid_width // 2, grid_height // 2
+    return (max(0, center_x - 3), max(0, center_y - 2),
+            min(grid_width, center_x + SPAWN_CLEARANCE + 1), min(grid_height, center_y + 3))
+
+def make_page(rng):
+    # A PAGE_SIZE square of clusters, dropping any cluster that would
+    # touch another. Returns its four mirror images as (rows, obstacle
+    # count per chunk).
+    page = bytearray(PAGE_SIZE * PAGE_SIZE)
+    screens = PAGE_SIZE * PAGE_SIZE / (GRID_WIDTH * GRID_HEIGHT)
+    for _ in range(round(rng.randint(*CLUSTERS_PER_SCREEN) * screens)):
+        radius = rng.randint(1, 3)
+        side = 2 * radius + 1
+        # Clusters and the cells around them stay inside the page
+        x0 = rng.randint(1, PAGE_SIZE - side - 1)
+        y0 = rng.randint(1, PAGE_SIZE - side - 1)
+        cluster = rng.choice(CLUSTERS[radius - 1])
+        margin = side + 2
+        start = (y0 - 1) * PAGE_SIZE + x0 - 1
+        if any(page.count(EMPTY, row, row + margin) != margin
+               for row in range(start, start + margin * PAGE_SIZE, PAGE_SIZE)):
+            continue
+        start += PAGE_SIZE + 1
+        for cells in cluster:
+            page[start:start + side] = cells
+            start += PAGE_SIZE
+
+    rows = [bytes(page[i:i + PAGE_SIZE]) for i in range(0, len(page), PAGE_SIZE)]
+    mirrored = [row[::-1] for row in rows]
+    # Obstacles per chunk, as a grid of chunk rows; mirroring the page
+    # mirrors this grid the same way
+    counts = [[sum(row.count(OBSTACLE, x, x + CHUNK_SIZE) for row in rows[y:y + CHUNK_SIZE])
+               for x in range(0, PAGE_SIZE, CHUNK_SIZE)]
+              for y in range(0, PAGE_SIZE, CHUNK_SIZE)]
+    counts_mirrored = [row[::-1] for row in counts]
+    return [(variant, [count for row in grid for count in row])
+            for variant, grid in ((rows, counts), (rows[::-1], counts[::-1]),
+                                  (mirrored, counts_mirrored),
+                                  (mirrored[::-1], counts_mirrored[::-1]))]
+
+class SnakeEngine:
+    def __init__(self, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                 difficulty=Difficulty.MEDIUM, obstacles_enabled=False,
+                 special_food_enabled=True, food_count=1):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.difficulty = difficulty
+        self.obstacles_enabled = obstacles_enabled
+        self.special_food_enabled = special_food_enabled
+        # Number of foods kept on the board (1 normally, many in frenzy mode)
+        self.food_count = food_count
+        self.special_food_chance = SPECIAL_FOOD_CHANCE
+        self.bonus_chance = BONUS_CHANCE
+
+        self.rng = random.Random()
+        self.seed = None
+        self.tick = 0
+        # Bumped on every reset so observers know to rebuild from scratch
+        self.generation = 0
+        # Observers with an add(cell) method, told about every cell change
+        self.watchers = []
+
+        # Body as a deque (head first) plus a flat occupancy grid indexed by
+        # y * grid_width + x, so moving and collision checks are O(1)
+        self.snake_positions = deque()
+        self.grid = bytearray(grid_width * grid_height)
+        # EMPTY cells are counted per chunk and per row of chunks, so a random
+        # free cell can be found without a list of every free cell (which
+        # would not fit for boards of thousands by thousands of cells)
+        self.chunk_cols = 0
+        self.chunk_free = []
+        self.row_free = []
+        self.free_count = 0
+        self.direction = Direction.RIGHT
+        # Tail cell given up on the last step (None if the snake grew)
+        self.last_tail = None
+        self.score = 0
+        self.game_over = False
+        # Foods keyed by position -> (food_type, expiry tick or 0)
+        self.foods = {}
+        self.expiring_foods = {}
+        self.speed_modifier = 1.0
+        self.speed_effect_time = 0
+        # Pending food expiries and effect ends, as ("food", pos) and
+        # ("effect", speed_effect_time) events; each is checked against the
+        # current state when it fires, as the food may have been eaten or
+        # the effect renewed
+        self.timers = TimerWheel()
+
+    def seconds_to_ticks(self, seconds):
+        return int(seconds * self.difficulty.value)
+
+    def reset(self, seed=None):
+        # Always run from a known seed so a game can be reproduced later
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.tick = 0
+        self.generation += 1
+
+        width, height = self.grid_width, self.grid_height
+        self.grid = bytearray(width * height)
+        self.chunk_cols = -(-width // CHUNK_SIZE)
+        chunk_rows = -(-height // CHUNK_SIZE)
+        chunk_widths = [min(CHUNK_SIZE, width - cx * CHUNK_SIZE) for cx in range(self.chunk_cols)]
+        chunk_heights = [min(CHUNK_SIZE, height - cy * CHUNK_SIZE) for cy in range(chunk_rows)]
+        self.chunk_free = [w * h for h in chunk_heights for w in chunk_widths]
+        self.row_free = [width * h for h in chunk_heights]
+        self.free_count = width * height
+
+        # Initialize snake in the middle of the board
+        center_x, center_y = self.grid_width // 2, self.grid_height // 2
+        self.snake_positions = deque()
+        for i in range(3):
+            pos = (center_x - i, center_y)
+            self.snake_positions.append(pos)
+            self.occupy(center_y * self.grid_width + center_x - i, SNAKE)
+
+        self.direction = Direction.RIGHT
+        self.last_tail = None
+        self.score = 0
+        self.game_over = False
+        self.timers.clear()
+
+        # Special effects
+        self.speed_modifier = 1.0
+        self.speed_effect_time = 0
+
+        # Generate obstacles if enabled, before any food, so food only ever
+        # lands on cells left free
+        self.foods = {}
+        self.expiring_foods = {}
+        if self.obstacles_enabled:
+            self.generate_obstacles()
+
+        self.add_food(FoodType.REGULAR)
+        while len(self.foods) < self.food_count and self.add_food():
+            pass
+
+    def snapshot(self):
+        # The whole state of the game in progress, for restore(), e.g. to
+        # roll back or branch in a tree search. The settings (board size,
+        # difficulty, food count, chances) are not part of it.
+        return (self.rng.getstate(), self.seed, self.tick, bytes(self.grid), list(self.chunk_free),
+                list(self.row_free), self.free_count, tuple(self.snake_positions), self.direction,
+                self.last_tail, self.score, self.game_over, dict(self.foods), dict(self.expiring_foods),
+                self.speed_modifier, self.speed_effect_time, self.timers.now, self.timers.events())
+
+    def restore(self, state):
+        # Go back to a snapshot() (which stays usable, to restore again)
+        (rng_state, self.seed, self.tick, grid, chunk_free, row_free, self.free_count, body,
+         self.direction, self.last_tail, self.score, self.game_over, foods, expiring_foods,
+         self.speed_modifier, self.speed_effect_time, timers_now, timer_events) = state
+        if len(grid) != len(self.grid):
+            raise ValueError("snapshot is from a board of a different size")
+        self.rng.setstate(rng_state)
+        self.grid[:] = grid
+        self.chunk_cols = -(-self.grid_width // CHUNK_SIZE)
+        self.chunk_free = list(chunk_free)
+        self.row_free = list(row_free)
+        self.snake_positions = deque(body)
+        self.foods = dict(foods)
+        self.expiring_foods = dict(expiring_foods)
+        self.timers.clear(timers_now)
+        for tick, event in timer_events:
+            self.timers.schedule(tick, event)
+        # Every cell may have changed
+        self.generation += 1
+
+    def cell_at(self, pos):
+        # Occupancy code of a board position
+        return self.grid[pos[1] * self.grid_width + pos[0]]
+
+    def watch(self, watcher):
+        self.watchers.append(watcher)
+
+    def unwatch(self, watcher):
+        self.watchers.remove(watcher)
+
+    def changed(self, cell):
+        for watcher in self.watchers:
+            watcher.add(cell)
+
+    def occupy(self, cell, code):
+        # Mark an EMPTY cell and take it off the free counts
+        self.grid[cell] = code
+        if self.watchers:
+            self.changed(cell)
+        y, x = divmod(cell, self.grid_width)
+        chunk_row = y >> CHUNK_SHIFT
+        self.chunk_free[chunk_row * self.chunk_cols + (x >> CHUNK_SHIFT)] -= 1
+        self.row_free[chunk_row] -= 1
+        self.free_count -= 1
+
+    def vacate(self, cell):
+        self.grid[cell] = EMPTY
+        if self.watchers:
+            self.changed(cell)
+        y, x = divmod(cell, self.grid_width)
+        chunk_row = y >> CHUNK_SHIFT
+        self.chunk_free[chunk_row * self.chunk_cols + (x >> CHUNK_SHIFT)] += 1
+        self.row_free[chunk_row] += 1
+        self.free_count += 1
+
+    def random_free_cell(self):
+        # A uniformly random EMPTY cell, or None when the board is full
+        if not self.free_count:
+            return None
+        rng = self.rng
+        grid = self.grid
+
+        # While the board is mostly empty a few random probes find one
+        num_cells = len(grid)
+        for _ in range(FREE_CELL_PROBES):
+            cell = rng.randrange(num_cells)
+            if grid[cell] == EMPTY:
+                return cell
+
+        # Otherwise pick the n-th free cell, walking down from the chunk row
+        # to the chunk to the row of cells, so the cost grows with the square
+        # root of the board rather than its area
+        n = rng.randrange(self.free_count)
+        totals = list(accumulate(self.row_free))
+        chunk_row = bisect_right(totals, n)
+        if chunk_row:
+            n -= totals[chunk_row - 1]
+        start = chunk_row * self.chunk_cols
+        totals = list(accumulate(self.chunk_free[start:start + self.chunk_cols]))
+        chunk_col = bisect_right(totals, n)
+        if chunk_col:
+            n -= totals[chunk_col - 1]
+
+        width = self.grid_width
+        x0 = chunk_col * CHUNK_SIZE
+        x1 = min(x0 + CHUNK_SIZE, width)
+        y0 = chunk_row * CHUNK_SIZE
+        for y in range(y0, min(y0 + CHUNK_SIZE, self.grid_height)):
+            start, end = y * width + x0, y * width + x1
+            free = grid.count(EMPTY, start, end)
+            if n < free:
+                empty = [i for i, code in enumerate(grid[start:end]) if code == EMPTY]
+                return start + empty[n]
+            n -= free
+        raise RuntimeError("free cell counts are out of sync with the grid")
+
+    def generate_obstacles(self):
+        # Cover the board with obstacle pages, each written a row of cells
+        # at a time, so a huge board costs little more than a small one. The
+        # pages leave their edge cells empty, which keeps clusters on
+        # different pages apart. Afterwards the spawn corridor is cleared and
+        # the snake and any food are put back (reset() places its food after
+        # this, so none ends up walled in).
+        rng = self.rng
+        grid = self.grid
+        width, height = self.grid_width, self.grid_height
+        pages_x = -(-width // PAGE_SIZE)
+        pages_y = -(-height // PAGE_SIZE)
+        library = [make_page(rng) for _ in range(min(pages_x * pages_y, PAGE_VARIETY))]
+        keep = {y * width + x: grid[y * width + x] for x, y in self.snake_positions}
+        keep.update((y * width + x, grid[y * width + x]) for x, y in self.foods)
+
+        chunks_per_page = PAGE_SIZE // CHUNK_SIZE
+        cols = self.chunk_cols
+        for page_y in range(pages_y):
+            y0 = page_y * PAGE_SIZE
+            # Pick a page and one of its mirror images for each spot in this
+            # band, then write whole board rows at once
+            band = [rng.choice(library)[rng.getrandbits(2)] for _ in range(pages_x)]
+            for dy in range(min(PAGE_SIZE, height - y0)):
+                start = (y0 + dy) * width
+                grid[start:start + width] = b"".join([rows[dy] for rows, _ in band])[:width]
+            for chunk_y in range(chunks_per_page):
+                chunk_row = (y0 >> CHUNK_SHIFT) + chunk_y
+                if chunk_row * CHUNK_SIZE >= height:
+                    break
+                start = chunk_y * chunks_per_page
+                free = [CHUNK_SIZE * CHUNK_SIZE - count for _, obstacles in band
+                        for count in obstacles[start:start + chunks_per_page]]
+                self.chunk_free[chunk_row * cols:(chunk_row + 1) * cols] = free[:cols]
+
+        # Chunks cut by the board edge hold fewer cells than the page counts assume
+        partial = set()
+        if width % CHUNK_SIZE:
+            partial.update(range(cols - 1, len(self.chunk_free), cols))
+        if height % CHUNK_SIZE:
+            partial.update(range(len(self.chunk_free) - cols, len(self.chunk_free)))
+
+        # Clear the way out of the spawn point and restore the snake and food
+        corridor_x0, corridor_y0, corridor_x1, corridor_y1 = spawn_corridor(width, height)
+        for y in range(corridor_y0, corridor_y1):
+            grid[y * width + corridor_x0:y * width + corridor_x1] = bytes(corridor_x1 - corridor_x0)
+            for x in (corridor_x0, corridor_x1 - 1):
+                partial.add((y >> CHUNK_SHIFT) * cols + (x >> CHUNK_SHIFT))
+        for cell, code in keep.items():
+            grid[cell] = code
+            y, x = divmod(cell, width)
+            partial.add((y >> CHUNK_SHIFT) * cols + (x >> CHUNK_SHIFT))
+
+        # Redo the free counts
+        for chunk in partial:
+            self.chunk_free[chunk] = self.count_free(chunk)
+        self.row_free = [sum(self.chunk_free[i:i + cols]) for i in range(0, len(self.chunk_free), cols)]
+        self.free_count = sum(self.row_free)
+        # The whole board changed; observers should start over
+        self.generation += 1
+
+    def count_free(self, chunk):
+        # EMPTY cells in a chunk, counted from the grid
+        grid = self.grid
+        width = self.grid_width
+        chunk_row, chunk_col = divmod(chunk, self.chunk_cols)
+        x0, y0 = chunk_col * CHUNK_SIZE, chunk_row * CHUNK_SIZE
+        x1 = min(x0 + CHUNK_SIZE, width)
+        return sum(grid.count(EMPTY, y * width + x0, y * width + x1)
+                   for y in range(y0, min(y0 + CHUNK_SIZE, self.grid_height)))
+
+    def obstacle_cells(self):
+        # Every obstacle cell, found by scanning the grid
+        grid = self.grid
+        cell = grid.find(OBSTACLE)
+        while cell != -1:
+            yield cell
+            cell = grid.find(OBSTACLE, cell + 1)
+
+    def add_food(self, food_type=None):
+        # Spawn food on a random free cell. Returns its position, or None when
+        # the board is full.
+        rng = self.rng
+        if food_type is None:
+            # If special food is enabled, randomly choose food type
+            if self.special_food_enabled and rng.random() < self.special_food_chance:
+                food_type = rng.choice(SPECIAL_FOODS)
+            else:
+                food_type = FoodType.REGULAR
+
+        cell = self.random_free_cell()
+        if cell is None:
+            return None
+        pos = (cell % self.grid_width, cell // self.grid_width)
+        self.place_food(pos, food_type)
+        return pos
+
+    def place_food(self, pos, food_type):
+        # Put food on a free cell
+        self.occupy(pos[1] * self.grid_width + pos[0], FOOD_BASE + food_type.value)
+
+        # For bonus food, set an expiry tick
+        timer = 0
+        if food_type == FoodType.BONUS:
+            timer = self.tick + self.seconds_to_ticks(BONUS_FOOD_SECONDS)
+            self.expiring_foods[pos] = timer
+            self.timers.schedule(timer, ("food", pos))
+
+        self.foods[pos] = (food_type, timer)
+
+    def remove_food(self, pos):
+        del self.foods[pos]
+        self.expiring_foods.pop(pos, None)
+        self.vacate(pos[1] * self.grid_width + pos[0])
+
+    def step(self, direction=None):
+        # Advance the game by one tick. Returns the FoodType eaten, if any.
+        if self.game_over:
+            return None
+
+        # Reversing straight into the neck is ignored
+        if direction is not None and direction != OPPOSITE[self.direction]:
+            self.direction = direction
+        self.tick += 1
+
+        # Calculate new head position
+        head_x, head_y = self.snake_positions[0]
+        dx, dy = self.direction.value
+        new_x = (head_x + dx) % self.grid_width
+        new_y = (head_y + dy) % self.grid_height
+        new_head = (new_x, new_y)
+        new_cell = new_y * self.grid_width + new_x
+        content = self.grid[new_cell]
+
+        # Check for collisions with obstacles or self (the tail still counts)
+        if content == SNAKE or content == OBSTACLE:
+            self.game_over = True
+            return None
+
+        # Move snake
+        self.snake_positions.appendleft(new_head)
+        eaten = None
+        if content == EMPTY:
+            self.occupy(new_cell, SNAKE)
+        else:
+            # The head landed on food: the cell goes straight from food to snake
+            self.grid[new_cell] = SNAKE
+            if self.watchers:
+                self.changed(new_cell)
+            eaten = FOOD_BY_CODE[content]
+            del self.foods[new_head]
+            self.expiring_foods.pop(new_head, None)
+
+            # Apply food effects
+            if eaten == FoodType.REGULAR:
+                self.score += 10
+            elif eaten == FoodType.BONUS:
+                self.score += 50
+            elif eaten == FoodType.SPEED:
+                self.start_effect(1.5)
+            elif eaten == FoodType.SLOW:
+                self.start_effect(0.7)
+
+            # Add a new food
+            self.add_food()
+
+        # Remove tail if no food was eaten
+        if eaten is None:
+            tail_x, tail_y = self.last_tail = self.snake_positions.pop()
+            self.vacate(tail_y * self.grid_width + tail_x)
+        else:
+            self.last_tail = None
+
+        # Expire bonus food and end speed effects that are due
+        for event in self.timers.advance(self.tick):
+            self.timer_fired(event)
+
+        # Add new bonus food occasionally (bonus food is the only food that expires)
+        if self.special_food_enabled and self.rng.random() < self.bonus_chance and not self.expiring_foods:
+            self.add_food(FoodType.BONUS)
+
+        # Keep the board stocked (matters once bonus food expires or in frenzy mode)
+        while len(self.foods) < self.food_count and self.add_food():
+            pass
+
+        return eaten
+
+    def start_effect(self, speed_modifier):
+        # Speed food: a new effect replaces the one running, if any
+        self.speed_modifier = speed_modifier
+        self.speed_effect_time = self.tick + self.seconds_to_ticks(SPEED_EFFECT_SECONDS)
+        # It lasts up to and including speed_effect_time
+        self.timers.schedule(self.speed_effect_time + 1, ("effect", self.speed_effect_time))
+
+    def timer_fired(self, event):
+        if event[0] == "food":
+            pos = event[1]
+            if self.expiring_foods.get(pos) == self.tick:
+                self.remove_food(pos)
+        elif event[1] == self.speed_effect_time:
+            self.speed_modifier = 1.0
+            self.speed_effect_time = 0
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from engine import Difficulty
+from replay import FLAG_OBSTACLES, FLAG_SPECIAL_FOOD
+from server import (DEFAULT_PORT, JOIN, TICK, MSG_JOIN, MSG_TURN, MSG_STATS, MSG_RESET_STATS,
+                    MSG_TICK, framed, read_message, percentile)
+
+# Load generator for server.py: thousands of bot clients spread over many
+# rooms, each turning at random now and then. Reports the tick jitter
+# seen by the server and by the clients, and the bytes sent per tick.
+#
+#   python loadgen.py --clients 2000 --rooms 1000 --seconds 10
+#
+# By default it starts its own server in a subprocess (so the two don't
+# share an event loop); use --external to load one that is already running.
+
+TURN_CHANCE = 0.1  # chance a bot sends a turn after each tick
+CONNECT_BATCH = 100
+
+class LoadStats:
+    def __init__(self):
+        self.connected = 0
+        self.ticks = 0
+        self.tick_bytes = 0
+        self.other_bytes = 0
+        # Time between tick messages minus the tick length, in seconds
+        self.jitter = []
+
+    def copy(self):
+        # A snapshot the bots don't write to (they keep appending to jitter)
+        seen = LoadStats()
+        seen.__dict__.update(self.__dict__)
+        seen.jitter = list(self.jitter)
+        return seen
+
+async def run_bot(host, port, room, difficulty, flags, rng, stats):
+    reader, writer = await asyncio.open_connection(host, port)
+    stats.connected += 1
+    writer.write(framed(MSG_JOIN + JOIN.pack(difficulty.value, flags, 0, 0) + room.encode()))
+    loop = asyncio.get_running_loop()
+    tick_length = 1.0 / difficulty.value
+    last = None
+    try:
+        while True:
+            message = await read_message(reader)
+            if message[:1] != MSG_TICK:
+                stats.other_bytes += len(message) + 4
+                last = None
+                continue
+            now = loop.time()
+            stats.ticks += 1
+            stats.tick_bytes += len(message) + 4
+            if last is not None:
+                stats.jitter.append(abs(now - last - tick_length))
+            last = now
+            game_over = TICK.unpack_from(message, 1)[2]
+            if game_over:
+                last = None
+            elif rng.random() < TURN_CHANCE:
+                writer.write(framed(MSG_TURN + bytes([rng.randrange(4)])))
+    finally:
+        writer.close()
+
+async def server_stats(host, port, kind=MSG_STATS):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(framed(kind))
+    message = await read_message(reader)
+    writer.close()
+    return json.loads(message[1:])
+
+async def wait_for_server(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+async def run(args):
+    difficulty = Difficulty[args.difficulty.upper()]
+    flags = ((FLAG_OBSTACLES if args.obstacles else 0)
+             | (FLAG_SPECIAL_FOOD if args.special_food else 0))
+    await wait_for_server(args.host, args.port)
+
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    bots = []
+    for start in range(0, args.clients, CONNECT_BATCH):
+        for i in range(start, min(start + CONNECT_BATCH, args.clients)):
+            bots.append(asyncio.create_task(run_bot(
+                args.host, args.port, f"room{i % args.rooms}", difficulty, flags,
+                random.Random(rng.random()), stats)))
+        await asyncio.sleep(0.05)
+    print(f"{stats.connected} clients connected to {min(args.rooms, args.clients)} rooms", flush=True)
+
+    # Measure only once everyone is in, on both sides: the server's stats
+    # start over with the clients'. The bots write to `stats` until they
+    # are cancelled, so the window is copied out as soon as it ends
+    await asyncio.sleep(1)
+    await server_stats(args.host, args.port, MSG_RESET_STATS)
+    stats.__init__()
+    stats.connected = sum(not bot.done() for bot in bots)
+    await asyncio.sleep(args.seconds)
+    seen = stats.copy()
+    server = await server_stats(args.host, args.port)
+    for bot in bots:
+        bot.cancel()
+    await asyncio.gather(*bots, return_exceptions=True)
+
+    jitter = sorted(seen.jitter)
+    print(f"server: {server['rooms']} rooms, {server['ticks']:,} room ticks, "
+          f"jitter p50 {server['jitter_ms']['p50']:.2f} ms, p99 {server['jitter_ms']['p99']:.2f} ms, "
+          f"max {server['jitter_ms']['max']:.2f} ms, {server['dropped_clients']} clients dropped")
+    print(f"server: {server['bytes_per_tick']:.1f} bytes per room tick")
+    print(f"clients: {seen.ticks / args.seconds:,.0f} tick messages/sec, "
+          f"{seen.tick_bytes / max(seen.ticks, 1):.1f} bytes per tick message, "
+          f"{(seen.tick_bytes + seen.other_bytes) / args.seconds / 1024:,.0f} KiB/sec received")
+    print(f"clients: tick interval jitter p50 {percentile(jitter, 0.50) * 1000:.2f} ms, "
+          f"p99 {percentile(jitter, 0.99) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--external", action="store_true",
+                        help="use a server that is already running instead of starting one")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--difficulty", default="medium", choices=["easy", "medium", "hard"])
+    parser.add_argument("--obstacles", action="store_true")
+    parser.add_argument("--special-food", action="store_true",
+                        help="enable speed foods (these change the tick rate, so client jitter includes them)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    if not args.external:
+        server = subprocess.Popen([sys.executable, "server.py", "--host", args.host,
+                                   "--port", str(args.port)], cwd=sys.path[0] or ".")
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,112 @@
+import numpy as np
+
+from engine import EMPTY, SNAKE, OBSTACLE, FOOD_BASE, FoodType
+
+# The board as a stack of uint8 planes for learning code, kept up to date
+# from the engine's cell watchers: a step rewrites the handful of cells it
+# changed (new head, old tail, eaten, placed and expired food) rather than
+# the whole board. The planes are one (planes, height, width) array:
+#
+#   HEAD        1 on the head
+#   BODY        1 on every snake cell, head included
+#   OBSTACLES   1 on obstacles
+#   FOOD_PLANES one plane per FoodType, 1 on that food
+#   ORDER       on snake cells, the tick (mod 256) the cell became the head,
+#               so a cell is (order[head] - order[cell]) % 256 segments
+#               behind the head; 0 elsewhere
+#
+# view() returns the same read-only array every time, without copying.
+#
+#   observation = BoardObservation(engine)
+#   board = observation.view()   # board[BODY], board[FOOD_PLANES[FoodType.BONUS]], ...
+
+# A cell with code c (other than EMPTY) is marked in plane c
+HEAD = 0
+BODY = SNAKE
+OBSTACLES = OBSTACLE
+FOOD_PLANES = {food_type: FOOD_BASE + food_type.value for food_type in FoodType}
+ORDER = max(FOOD_PLANES.values()) + 1
+PLANES = ORDER + 1
+
+class BoardObservation:
+    def __init__(self, engine):
+        self.engine = None
+        self.attach(engine)
+
+    def attach(self, engine):
+        if self.engine is engine:
+            return
+        self.close()
+        self.engine = engine
+        self.plane = engine.grid_width * engine.grid_height
+        # The planes, written through the bytearray and read through the
+        # array on top of it
+        self.buffer = bytearray(PLANES * self.plane)
+        self.array = np.frombuffer(self.buffer, dtype=np.uint8).reshape(
+            PLANES, engine.grid_height, engine.grid_width)
+        self.read_only = self.array.view()
+        self.read_only.flags.writeable = False
+        # Cell codes as of the last update, to know which plane to clear
+        self.codes = bytearray(self.plane)
+        self.head = None
+        engine.watch(self)
+        # Generations are per engine, so rebuild everything for a new one
+        self.generation = None
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.unwatch(self)
+            self.engine = None
+
+    def add(self, cell):
+        # Engine callback for every changed cell
+        engine = self.engine
+        if engine.generation != self.generation:
+            return  # rebuilt from scratch on the next view()
+        code = engine.grid[cell]
+        old = self.codes[cell]
+        if code == old:
+            return
+        buffer, plane = self.buffer, self.plane
+        self.codes[cell] = code
+        if old != EMPTY:
+            buffer[old * plane + cell] = 0
+            if old == SNAKE:
+                buffer[ORDER * plane + cell] = 0
+                if cell == self.head:
+                    buffer[cell] = 0
+                    self.head = None
+        if code != EMPTY:
+            buffer[code * plane + cell] = 1
+            if code == SNAKE:
+                # During a step a cell only turns into snake as the new head
+                buffer[ORDER * plane + cell] = engine.tick & 0xFF
+                if self.head is not None:
+                    buffer[self.head] = 0
+                buffer[cell] = 1
+                self.head = cell
+
+    def rebuild(self):
+        engine = self.engine
+        self.generation = engine.generation
+        width = engine.grid_width
+        grid = np.frombuffer(engine.grid, dtype=np.uint8)
+        self.codes[:] = engine.grid
+        planes = self.array.reshape(PLANES, -1)
+        planes[:] = 0
+        for code in range(SNAKE, ORDER):
+            planes[code] = grid == code
+        body = np.array([y * width + x for x, y in engine.snake_positions], dtype=np.int64)
+        # Segment i became the head i ticks ago
+        planes[ORDER, body] = (engine.tick - np.arange(len(body))) & 0xFF
+        # No snake yet before the engine's first reset
+        self.head = int(body[0]) if len(body) else None
+        if self.head is not None:
+            planes[HEAD, self.head] = 1
+
+    def view(self):
+        # The planes as a read-only (PLANES, height, width) uint8 array;
+        # always the same array, updated in place as the game goes on
+        if self.engine.generation != self.generation:
+            self.rebuild()
+        return self.read_only
@@ -0,0 +1,154 @@
+import csv
+import json
+
+import pygame
+
+from colors import WHITE, GREEN, GOLD, RED
+
+# Rolling per-frame metrics for the main loop, an on-screen panel with a
+# frame-time histogram and CSV/JSON export. Recording is one tuple per
+# frame, so it is left on all the time; the panel is only built while it is
+# shown, and then only a few times per second.
+
+PHASES = ["handle_keys", "update", "draw", "display"]
+FIELDS = (["time"] + PHASES
+          + ["ticks", "target_tick_rate", "fps", "snake_length", "food_count", "input_latency"])
+FRAME_HISTORY = 600  # about 10 seconds at 60 fps
+REFRESH_FRAMES = 15  # panel rebuilds every this many frames
+HISTOGRAM_BIN_MS = 2
+HISTOGRAM_BINS = 17  # the last bin collects every slower frame
+PANEL_WIDTH = 270
+HISTOGRAM_HEIGHT = 50
+MARGIN = 8
+PANEL_COLOR = (15, 15, 15)
+
+def mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+def p95(values):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+class FrameProfiler:
+    def __init__(self, font, history=FRAME_HISTORY):
+        self.font = font
+        self.history = history
+        # Ring buffer of rows laid out as FIELDS (phase timings in ms)
+        self.frames = []
+        self.next = 0
+        self.visible = False
+        self.panel = None
+        self.frames_until_refresh = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.frames_until_refresh = 0
+
+    def record(self, now, timings, ticks, target_tick_rate, fps, snake_length, food_count,
+               input_latency):
+        # timings are the PHASES durations in seconds
+        row = (now,) + tuple(t * 1000 for t in timings) + (
+            ticks, target_tick_rate, fps, snake_length, food_count, input_latency)
+        if len(self.frames) < self.history:
+            self.frames.append(row)
+        else:
+            self.frames[self.next] = row
+            self.next = (self.next + 1) % self.history
+
+    def ordered(self):
+        # Recorded frames, oldest first
+        return self.frames[self.next:] + self.frames[:self.next]
+
+    def frame_times(self, frames):
+        return [sum(row[1:1 + len(PHASES)]) for row in frames]
+
+    def summary(self):
+        frames = self.ordered()
+        if not frames:
+            return {}
+        summary = {}
+        for i, phase in enumerate(PHASES, start=1):
+            values = [row[i] for row in frames]
+            summary[phase] = {"mean_ms": mean(values), "p95_ms": p95(values), "max_ms": max(values)}
+        frame_times = self.frame_times(frames)
+        summary["frame"] = {"mean_ms": mean(frame_times), "p95_ms": p95(frame_times),
+                            "max_ms": max(frame_times)}
+
+        # Simulation rate over the recorded window versus what it should be
+        span = frames[-1][0] - frames[0][0]
+        ticks = sum(row[5] for row in frames[1:])
+        last = frames[-1]
+        summary["tick_rate"] = ticks / span if span > 0 else 0.0
+        summary["target_tick_rate"] = last[6]
+        summary["fps"] = last[7]
+        summary["snake_length"] = last[8]
+        summary["food_count"] = last[9]
+        summary["input_latency_ms"] = last[10]
+        return summary
+
+    def histogram(self):
+        counts = [0] * HISTOGRAM_BINS
+        for frame_time in self.frame_times(self.frames):
+            counts[min(int(frame_time // HISTOGRAM_BIN_MS), HISTOGRAM_BINS - 1)] += 1
+        return counts
+
+    def export(self, path):
+        # CSV of the recorded frames, or JSON with a summary when the path
+        # ends in .json
+        frames = self.ordered()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(),
+                           "frames": [dict(zip(FIELDS, row)) for row in frames]}, f, indent=2)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(FIELDS)
+                writer.writerows(frames)
+
+    def draw(self, screen):
+        # Blit the panel in the bottom right corner; returns its rect
+        if self.frames_until_refresh <= 0 or self.panel is None:
+            self.panel = self.build_panel()
+            self.frames_until_refresh = REFRESH_FRAMES
+        self.frames_until_refresh -= 1
+        rect = self.panel.get_rect(bottomright=screen.get_rect().bottomright)
+        return screen.blit(self.panel, rect)
+
+    def build_panel(self):
+        summary = self.summary()
+        lines = []
+        if summary:
+            for phase in PHASES:
+                lines.append((f"{phase:<12} {summary[phase]['mean_ms']:5.2f} / {summary[phase]['p95_ms']:5.2f} ms", WHITE))
+            frame = summary["frame"]
+            slow = frame["p95_ms"] > 1000 / 60
+            lines.append((f"frame        {frame['mean_ms']:5.2f} / {frame['p95_ms']:5.2f} ms", RED if slow else GREEN))
+            lines.append((f"fps {summary['fps']:.0f}   ticks/s {summary['tick_rate']:.1f} / {summary['target_tick_rate']:.1f}", WHITE))
+            lines.append((f"length {summary['snake_length']}   food {summary['food_count']}", WHITE))
+            lines.append((f"input latency {summary['input_latency_ms']:.1f} ms", WHITE))
+
+        line_height = self.font.get_linesize()
+        height = MARGIN * 3 + len(lines) * line_height + HISTOGRAM_HEIGHT
+        # Opaque, so the board underneath never has to be redrawn for it
+        panel = pygame.Surface((PANEL_WIDTH, height))
+        panel.fill(PANEL_COLOR)
+        y = MARGIN
+        for text, color in lines:
+            panel.blit(self.font.render(text, True, color), (MARGIN, y))
+            y += line_height
+
+        # Frame-time histogram, 2 ms per bar; bars past 16 ms are red
+        counts = self.histogram()
+        tallest = max(counts) or 1
+        bar_width = (PANEL_WIDTH - 2 * MARGIN) // HISTOGRAM_BINS
+        bottom = height - MARGIN
+        for i, count in enumerate(counts):
+            bar_height = round(count / tallest * HISTOGRAM_HEIGHT)
+            if bar_height:
+                color = GOLD if i * HISTOGRAM_BIN_MS < 16 else RED
+                pygame.draw.rect(panel, color, (MARGIN + i * bar_width, bottom - bar_height,
+                                                bar_width - 1, bar_height))
+        return panel
@@ -0,0 +1,286 @@
+import pygame
+
+from colors import BLACK
+from engine import FoodType, EMPTY, SNAKE, OBSTACLE, FOOD_BASE, FOOD_BY_CODE, CHUNK_SIZE
+from sprites import SpriteCache, LRUCache, pulse_bucket
+
+# Baked background chunks kept around; a 800x600 view shows at most 12
+MAX_CHUNKS = 64
+
+def is_adjacent(a, b):
+    # True unless the move wrapped around the board edge
+    return abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1
+
+def lerp(a, b, alpha, size):
+    # Pixel position between cells a and b
+    return (round((a[0] + (b[0] - a[0]) * alpha) * size),
+            round((a[1] + (b[1] - a[1]) * alpha) * size))
+
+class BoardRenderer:
+    # Draws the part of the board under the camera with dirty rectangles.
+    # The background tiles and obstacles are baked per chunk of the board
+    # (see engine.CHUNK_SIZE) as the camera reaches them; after that each
+    # frame only redraws the cells that changed (new head, old head, old
+    # tail), food cells whose animation frame changed and whatever the caller
+    # invalidated. Cell graphics come from the sprite cache. Frame cost
+    # depends on the screen size, not the board size.
+
+    def __init__(self, screen, cell_size, sprites=None):
+        self.screen = screen
+        self.cell_size = cell_size
+        self.sprites = sprites or SpriteCache(cell_size)
+        self.food_frame = None
+        self.engine = None
+        self.generation = None
+        self.chunks = LRUCache(MAX_CHUNKS)
+        self.dirty = set()
+        self.last_head = None
+        # Stripe (0/1) of each body cell, fixed when the cell became the head
+        # so segments keep their colour as the snake moves
+        self.stripes = bytearray()
+        self.needs_full = True
+        self.moving_cells = ()
+
+        # Visible cells and the board cell shown in the top left corner
+        self.view_cols = -(-screen.get_width() // cell_size)
+        self.view_rows = -(-screen.get_height() // cell_size)
+        self.camera = (0, 0)
+
+    def attach(self, engine):
+        if self.engine is engine:
+            return
+        if self.engine is not None:
+            self.engine.unwatch(self)
+        self.engine = engine
+        engine.watch(self)
+        # Generations are per engine, so rebuild everything for a new one
+        self.generation = None
+
+    def add(self, cell):
+        # Engine callback for every changed cell
+        engine = self.engine
+        if engine.generation != self.generation:
+            return  # a full redraw is coming anyway
+        self.dirty.add(cell)
+        if engine.grid[cell] == SNAKE:
+            self.stripes[cell] = engine.tick & 1
+
+    def invalidate(self):
+        self.needs_full = True
+
+    def invalidate_rect(self, rect):
+        # Mark the cells under a screen rect (e.g. last frame's HUD text)
+        size = self.cell_size
+        engine = self.engine
+        camera_x, camera_y = self.camera
+        rect = pygame.Rect(rect).clip(self.screen.get_rect())
+        for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for x in range(rect.left // size, (rect.right - 1) // size + 1):
+                if x + camera_x < engine.grid_width and y + camera_y < engine.grid_height:
+                    self.dirty.add((y + camera_y) * engine.grid_width + x + camera_x)
+
+    def follow(self, engine, center=False):
+        # Move the camera so the head stays at least a quarter of the screen
+        # away from the edges (or centre it). Returns True if it moved.
+        head_x, head_y = engine.snake_positions[0]
+        camera_x, camera_y = self.camera
+        margin_x, margin_y = self.view_cols // 4, self.view_rows // 4
+        if center:
+            camera_x = head_x - self.view_cols // 2
+            camera_y = head_y - self.view_rows // 2
+        if head_x < camera_x + margin_x:
+            camera_x = head_x - margin_x
+        elif head_x >= camera_x + self.view_cols - margin_x:
+            camera_x = head_x - self.view_cols + margin_x + 1
+        if head_y < camera_y + margin_y:
+            camera_y = head_y - margin_y
+        elif head_y >= camera_y + self.view_rows - margin_y:
+            camera_y = head_y - self.view_rows + margin_y + 1
+
+        # Never show past the edges of the board
+        camera = (max(0, min(camera_x, engine.grid_width - self.view_cols)),
+                  max(0, min(camera_y, engine.grid_height - self.view_rows)))
+        moved = camera != self.camera
+        self.camera = camera
+        return moved
+
+    def is_visible(self, cell, width):
+        y, x = divmod(cell, width)
+        x -= self.camera[0]
+        y -= self.camera[1]
+        return 0 <= x < self.view_cols and 0 <= y < self.view_rows
+
+    def chunk(self, engine, chunk_x, chunk_y):
+        # Background tiles plus obstacles for one chunk of the board
+        surface = self.chunks.get((chunk_x, chunk_y))
+        if surface is not None:
+            return surface
+        size = self.cell_size
+        width = engine.grid_width
+        x0, y0 = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        x1 = min(x0 + CHUNK_SIZE, width)
+        y1 = min(y0 + CHUNK_SIZE, engine.grid_height)
+        surface = pygame.Surface(((x1 - x0) * size, (y1 - y0) * size))
+        for x in range(0, surface.get_width(), size):
+            for y in range(0, surface.get_height(), size):
+                surface.blit(self.sprites.tile, (x, y))
+
+        grid = engine.grid
+        obstacle = self.sprites.obstacle()
+        for y in range(y0, y1):
+            end = y * width + x1
+            cell = grid.find(OBSTACLE, y * width + x0, end)
+            while cell != -1:
+                surface.blit(obstacle, ((cell - y * width - x0) * size, (y - y0) * size))
+                cell = grid.find(OBSTACLE, cell + 1, end)
+        self.chunks.put((chunk_x, chunk_y), surface)
+        return surface
+
+    def draw(self, engine, now, full=False, alpha=1.0):
+        # Draw the board for time `now` (ms). alpha (0..1) is how far the
+        # frame is between the last tick and the next; below 1 the head and
+        # tail are drawn sliding between cells. Returns the screen rects that
+        # changed, to be passed to pygame.display.update.
+        self.attach(engine)
+        width = engine.grid_width
+        head_x, head_y = engine.snake_positions[0]
+        head = head_y * width + head_x
+
+        if engine.generation != self.generation:
+            self.generation = engine.generation
+            self.stripes = bytearray(len(engine.grid))
+            for i, (x, y) in enumerate(engine.snake_positions):
+                self.stripes[y * width + x] = i & 1
+            self.chunks = LRUCache(MAX_CHUNKS)
+            self.follow(engine, center=True)
+            full = True
+        elif self.follow(engine):
+            full = True
+
+        if full or self.needs_full:
+            self.needs_full = False
+            self.food_frame = (pulse_bucket(now), (now // 200) % 2, engine.tick)
+            self.dirty.clear()
+            self.last_head = head
+            self.draw_view(engine, head, now)
+            self.moving_cells = self.draw_moving(engine, alpha)
+            return [self.screen.get_rect()]
+
+        # The old head becomes a body segment
+        dirty = self.dirty
+        dirty.add(self.last_head)
+        dirty.add(head)
+        self.last_head = head
+
+        # Cells that the sliding head and tail were drawn over last frame,
+        # and the ones they will be drawn over now
+        dirty.update(self.moving_cells)
+        if alpha < 1.0:
+            dirty.update(self.sliding_cells(engine))
+
+        # Food only needs repainting when its animation frame changes (or on
+        # a new tick, when bonus food may start blinking)
+        food_frame = (pulse_bucket(now), (now // 200) % 2, engine.tick)
+        if food_frame != self.food_frame:
+            self.food_frame = food_frame
+            for x, y in engine.foods:
+                dirty.add(y * width + x)
+
+        size = self.cell_size
+        camera_x, camera_y = self.camera
+        rects = []
+        for cell in dirty:
+            if self.is_visible(cell, width):
+                self.draw_cell(engine, cell, head, now)
+                rects.append(((cell % width - camera_x) * size, (cell // width - camera_y) * size,
+                              size, size))
+        dirty.clear()
+        self.moving_cells = self.draw_moving(engine, alpha)
+        return rects
+
+    def draw_view(self, engine, head, now):
+        # Repaint everything under the camera: background chunks, then the
+        # snake and food cells found by scanning the visible rows
+        size = self.cell_size
+        width, height = engine.grid_width, engine.grid_height
+        camera_x, camera_y = self.camera
+        x1 = min(camera_x + self.view_cols, width)
+        y1 = min(camera_y + self.view_rows, height)
+        if x1 - camera_x < self.view_cols or y1 - camera_y < self.view_rows:
+            self.screen.fill(BLACK)  # the board is smaller than the screen
+
+        for chunk_y in range(camera_y // CHUNK_SIZE, (y1 - 1) // CHUNK_SIZE + 1):
+            for chunk_x in range(camera_x // CHUNK_SIZE, (x1 - 1) // CHUNK_SIZE + 1):
+                self.screen.blit(self.chunk(engine, chunk_x, chunk_y),
+                                 ((chunk_x * CHUNK_SIZE - camera_x) * size,
+                                  (chunk_y * CHUNK_SIZE - camera_y) * size))
+
+        grid = engine.grid
+        for y in range(camera_y, y1):
+            start = y * width + camera_x
+            row = grid[start:y * width + x1]
+            if row.count(EMPTY) + row.count(OBSTACLE) == len(row):
+                continue
+            for i, code in enumerate(row):
+                if code == SNAKE or code > FOOD_BASE:
+                    self.draw_cell(engine, start + i, head, now)
+
+    def sliding_cells(self, engine):
+        # Neck and head, then the old and current tail
+        width = engine.grid_width
+        cells = [y * width + x for x, y in (engine.snake_positions[1], engine.snake_positions[0],
+                                            engine.snake_positions[-1])]
+        if engine.last_tail is not None:
+            x, y = engine.last_tail
+            cells.append(y * width + x)
+        return cells
+
+    def draw_moving(self, engine, alpha):
+        # Interpolated head and tail on top of the settled board. Returns
+        # the cells drawn over.
+        if alpha >= 1.0 or engine.game_over:
+            return ()
+        size = self.cell_size
+        offset_x, offset_y = self.camera[0] * size, self.camera[1] * size
+        cells = self.sliding_cells(engine)
+
+        # The tail segment slides off the cell it gave up this tick
+        tail = engine.snake_positions[-1]
+        if engine.last_tail is not None and is_adjacent(engine.last_tail, tail):
+            stripe = self.stripes[cells[3]]
+            x, y = lerp(engine.last_tail, tail, alpha, size)
+            self.screen.blit(self.sprites.segment(stripe), (x - offset_x, y - offset_y))
+
+        # The head slides from the neck into its new cell
+        neck, head = engine.snake_positions[1], engine.snake_positions[0]
+        if is_adjacent(neck, head):
+            self.screen.blit(self.sprites.tile, (head[0] * size - offset_x, head[1] * size - offset_y))
+            x, y = lerp(neck, head, alpha, size)
+            self.screen.blit(self.sprites.head(engine.direction), (x - offset_x, y - offset_y))
+        return cells
+
+    def draw_cell(self, engine, cell, head, now):
+        size = self.cell_size
+        width = engine.grid_width
+        x, y = cell % width, cell // width
+        rect = ((x - self.camera[0]) * size, (y - self.camera[1]) * size)
+
+        code = engine.grid[cell]
+        if code == SNAKE:
+            if cell == head:
+                self.screen.blit(self.sprites.head(engine.direction), rect)
+            else:
+                self.screen.blit(self.sprites.segment(self.stripes[cell]), rect)
+        elif code > FOOD_BASE:
+            food_type = FOOD_BY_CODE[code]
+            if food_type == FoodType.BONUS:
+                # Draw with blinking effect if about to expire
+                timer = engine.foods[(x, y)][1]
+                if not (timer == 0 or timer - engine.tick > engine.difficulty.value or (now // 200) % 2):
+                    self.screen.blit(self.sprites.tile, rect)
+                    return
+            self.screen.blit(self.sprites.food(food_type, pulse_bucket(now)), rect)
+        elif code == OBSTACLE:
+            self.screen.blit(self.sprites.obstacle(), rect)
+        else:
+            self.screen.blit(self.sprites.tile, rect)
@@ -0,0 +1,169 @@
+import struct
+import sys
+import time
+import zlib
+
+from engine import SnakeEngine, Direction, Difficulty
+
+# Compact replay files. A game is fully determined by its seed, its
+# settings and the direction the snake moved on every tick, so that is all
+# a replay stores: a fixed header and a zlib-compressed stream of 2-bit
+# direction codes (4 ticks per byte).
+
+MAGIC = b"SNKR"
+# Bumped whenever the engine would play the same moves out differently
+VERSION = 4
+# magic, version, seed, grid width, grid height, difficulty, flags,
+# food count, tick count
+HEADER = struct.Struct("<4sBQHHBBHI")
+
+FLAG_OBSTACLES = 1
+FLAG_SPECIAL_FOOD = 2
+
+DIRECTIONS = list(Direction)
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+# Packed byte -> the four direction codes it holds
+UNPACKED = [bytes((byte >> shift) & 3 for shift in (0, 2, 4, 6)) for byte in range(256)]
+
+class ReplayError(Exception):
+    pass
+
+class Replay:
+    def __init__(self, seed, grid_width, grid_height, difficulty, obstacles_enabled,
+                 special_food_enabled, food_count=1, moves=b""):
+        self.seed = seed
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.difficulty = difficulty
+        self.obstacles_enabled = obstacles_enabled
+        self.special_food_enabled = special_food_enabled
+        self.food_count = food_count
+        # One direction code per tick
+        self.moves = bytearray(moves)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def make_engine(self):
+        engine = SnakeEngine(self.grid_width, self.grid_height, self.difficulty,
+                             self.obstacles_enabled, self.special_food_enabled, self.food_count)
+        engine.reset(self.seed)
+        return engine
+
+    def to_bytes(self):
+        moves = self.moves
+        packed = bytearray((len(moves) + 3) // 4)
+        for i, code in enumerate(moves):
+            packed[i >> 2] |= code << ((i & 3) * 2)
+
+        flags = ((FLAG_OBSTACLES if self.obstacles_enabled else 0)
+                 | (FLAG_SPECIAL_FOOD if self.special_food_enabled else 0))
+        header = HEADER.pack(MAGIC, VERSION, self.seed, self.grid_width, self.grid_height,
+                             self.difficulty.value, flags, self.food_count, len(moves))
+        return header + zlib.compress(bytes(packed), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("replay file is truncated")
+        (magic, version, seed, grid_width, grid_height, difficulty, flags,
+         food_count, ticks) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("not a replay file")
+        if version != VERSION:
+            raise ReplayError(f"unsupported replay version {version}")
+        try:
+            packed = zlib.decompress(data[HEADER.size:])
+        except zlib.error as e:
+            raise ReplayError(f"corrupt move stream: {e}")
+        moves = b"".join(UNPACKED[byte] for byte in packed)[:ticks]
+        if len(moves) != ticks:
+            raise ReplayError("move stream is shorter than the tick count")
+
+        return cls(seed, grid_width, grid_height, Difficulty(difficulty),
+                   bool(flags & FLAG_OBSTACLES), bool(flags & FLAG_SPECIAL_FOOD),
+                   food_count, moves)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+class ReplayRecorder:
+    # Records the game an engine is playing. Call start() right after the
+    # engine is reset and record() after every step.
+
+    def __init__(self):
+        self.replay = None
+        self.engine = None
+
+    def start(self, engine):
+        self.engine = engine
+        self.replay = Replay(engine.seed, engine.grid_width, engine.grid_height,
+                             engine.difficulty, engine.obstacles_enabled,
+                             engine.special_food_enabled, engine.food_count)
+
+    def record(self):
+        self.replay.moves.append(DIRECTION_CODES[self.engine.direction])
+
+    def save(self, path):
+        self.replay.save(path)
+
+class ReplayPlayer:
+    # Re-simulates a replay tick by tick, with seeking for visual playback
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.engine = replay.make_engine()
+        self.position = 0
+
+    @property
+    def finished(self):
+        return self.position >= len(self.replay) or self.engine.game_over
+
+    def restart(self):
+        self.engine.reset(self.replay.seed)
+        self.position = 0
+
+    def step(self):
+        if self.finished:
+            return None
+        direction = DIRECTIONS[self.replay.moves[self.position]]
+        self.position += 1
+        return self.engine.step(direction)
+
+    def seek(self, tick):
+        # Jump to a tick, re-simulating from the start when going back
+        tick = max(0, min(tick, len(self.replay)))
+        if tick < self.position:
+            self.restart()
+        while self.position < tick and not self.finished:
+            self.step()
+
+def simulate(replay):
+    # Headless playback; returns the engine in its final state
+    engine = replay.make_engine()
+    step = engine.step
+    for code in replay.moves:
+        step(DIRECTIONS[code])
+    return engine
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python replay.py REPLAY_FILE")
+        sys.exit(2)
+    replay = Replay.load(sys.argv[1])
+    start = time.perf_counter()
+    engine = simulate(replay)
+    elapsed = time.perf_counter() - start
+    print(f"seed {replay.seed}, {replay.difficulty.name}, "
+          f"obstacles {'ON' if replay.obstacles_enabled else 'OFF'}, "
+          f"special food {'ON' if replay.special_food_enabled else 'OFF'}")
+    print(f"{len(replay)} ticks -> score {engine.score}, length {len(engine.snake_positions)}, "
+          f"{'game over' if engine.game_over else 'still alive'}")
+    print(f"re-simulated at {len(replay) / max(elapsed, 1e-9):,.0f} ticks/sec")
@@ -0,0 +1,175 @@
+import argparse
+import sqlite3
+import time
+from collections import Counter
+
+from engine import Difficulty, GRID_WIDTH, GRID_HEIGHT, FRENZY_FOOD_COUNT
+
+# Every finished game, kept in a local SQLite database so scores survive
+# restarts (and crashes: the database runs in write-ahead-log mode, so a
+# crash loses at most the last write, never the file). Each run stores its
+# score, length, duration and settings (difficulty, obstacles, special
+# food, food count and board size), plus who played it ("human",
+# "autopilot" or a tournament policy). Alongside the runs, a small table
+# counts the runs per player, settings and score; the high score and the
+# percentiles are read from it and the top runs from an index, so they
+# stay instant however many runs are stored.
+#
+#   python scores.py --difficulty medium --top 10
+#   python scores.py --frenzy --width 200 --height 150
+
+DEFAULT_PATH = "scores.db"
+HUMAN = "human"
+PERCENTILES = [0.10, 0.50, 0.90, 0.99]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,
+    player TEXT NOT NULL,
+    difficulty INTEGER NOT NULL,
+    obstacles INTEGER NOT NULL,
+    special_food INTEGER NOT NULL,
+    food_count INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    duration REAL NOT NULL
+);
+-- Top-k per player and settings
+CREATE INDEX IF NOT EXISTS runs_by_settings
+    ON runs (player, difficulty, obstacles, special_food, food_count, width, height, score);
+-- How many runs got each score: one row per score, not per run
+CREATE TABLE IF NOT EXISTS score_counts (
+    player TEXT NOT NULL,
+    difficulty INTEGER NOT NULL,
+    obstacles INTEGER NOT NULL,
+    special_food INTEGER NOT NULL,
+    food_count INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (player, difficulty, obstacles, special_food, food_count, width, height, score)
+) WITHOUT ROWID;
+"""
+
+INSERT = """
+INSERT INTO runs (played_at, player, difficulty, obstacles, special_food, food_count, width, height,
+                  score, length, ticks, duration)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+COUNT = """
+INSERT INTO score_counts (player, difficulty, obstacles, special_food, food_count, width, height, score, runs)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT DO UPDATE SET runs = runs + excluded.runs
+"""
+
+SETTINGS = ("player = ? AND difficulty = ? AND obstacles = ? AND special_food = ? "
+            "AND food_count = ? AND width = ? AND height = ?")
+
+class ScoreStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # With a write-ahead log this still can't corrupt the database; it
+        # only skips the fsync on every commit
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def record(self, engine, duration, player=HUMAN):
+        # Store the game the engine just finished
+        settings = (player, engine.difficulty.value, int(engine.obstacles_enabled),
+                    int(engine.special_food_enabled), engine.food_count,
+                    engine.grid_width, engine.grid_height)
+        with self.db:
+            self.db.execute(INSERT, (time.time(),) + settings + (
+                engine.score, len(engine.snake_positions), engine.tick, duration))
+            self.db.execute(COUNT, settings + (engine.score, 1))
+
+    def record_many(self, player, difficulty, obstacles, special_food, runs,
+                    food_count=1, width=GRID_WIDTH, height=GRID_HEIGHT):
+        # Bulk insert in one transaction. `runs` yields (score, length,
+        # ticks, duration) for games played with the same settings.
+        settings = (player, difficulty.value, int(obstacles), int(special_food), food_count, width, height)
+        rows = [(time.time(),) + settings + tuple(run) for run in runs]
+        counts = Counter(row[len(settings) + 1] for row in rows)
+        with self.db:
+            self.db.executemany(INSERT, rows)
+            self.db.executemany(COUNT, (settings + item for item in counts.items()))
+
+    def best(self, player=HUMAN, food_count=1, width=GRID_WIDTH, height=GRID_HEIGHT):
+        # Highest score with this food count and board size over all other
+        # settings (0 before the first run), one index lookup per
+        # combination of settings
+        query = f"SELECT MAX(score) FROM score_counts WHERE {SETTINGS}"
+        return max(self.db.execute(query, (player, difficulty.value, obstacles, special_food,
+                                           food_count, width, height)).fetchone()[0] or 0
+                   for difficulty in Difficulty for obstacles in (0, 1) for special_food in (0, 1))
+
+    def count(self, difficulty, obstacles, special_food, player=HUMAN,
+              food_count=1, width=GRID_WIDTH, height=GRID_HEIGHT):
+        (count,) = self.db.execute(f"SELECT SUM(runs) FROM score_counts WHERE {SETTINGS}",
+                                   (player, difficulty.value, int(obstacles), int(special_food),
+                                    food_count, width, height)).fetchone()
+        return count or 0
+
+    def top(self, difficulty, obstacles, special_food, k=10, player=HUMAN,
+            food_count=1, width=GRID_WIDTH, height=GRID_HEIGHT):
+        # The k best runs with these settings as (score, length, duration,
+        # played_at), best first
+        return self.db.execute(
+            f"SELECT score, length, duration, played_at FROM runs WHERE {SETTINGS} "
+            "ORDER BY score DESC LIMIT ?",
+            (player, difficulty.value, int(obstacles), int(special_food), food_count, width, height, k)).fetchall()
+
+    def percentiles(self, difficulty, obstacles, special_food, fractions=PERCENTILES, player=HUMAN,
+                    food_count=1, width=GRID_WIDTH, height=GRID_HEIGHT):
+        # Nearest-rank score percentiles with these settings, walking the
+        # runs per score in order
+        counts = self.db.execute(f"SELECT score, runs FROM score_counts WHERE {SETTINGS} ORDER BY score",
+                                 (player, difficulty.value, int(obstacles), int(special_food),
+                                  food_count, width, height)).fetchall()
+        total = sum(runs for _, runs in counts)
+        result = {}
+        for fraction in fractions:
+            rank = max(1, min(total, round(fraction * total)))
+            seen = 0
+            for score, runs in counts:
+                seen += runs
+                if seen >= rank:
+                    break
+            result[fraction] = score if counts else 0
+        return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Leaderboard and run history")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    parser.add_argument("--player", default=HUMAN, help="human, autopilot or a tournament policy")
+    parser.add_argument("--difficulty", default="medium", choices=["easy", "medium", "hard"])
+    parser.add_argument("--obstacles", action="store_true")
+    parser.add_argument("--no-special-food", action="store_true")
+    parser.add_argument("--frenzy", action="store_true", help="games played with frenzy food")
+    parser.add_argument("--width", type=int, default=GRID_WIDTH, help="board width in cells")
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT, help="board height in cells")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    settings = (Difficulty[args.difficulty.upper()], args.obstacles, not args.no_special_food)
+    board = {"player": args.player, "food_count": FRENZY_FOOD_COUNT if args.frenzy else 1,
+             "width": args.width, "height": args.height}
+    print(f"{store.count(*settings, **board):,} runs, best on this board {store.best(**board)}")
+    for rank, (score, length, duration, played_at) in enumerate(store.top(*settings, k=args.top, **board), 1):
+        print(f"{rank:>3}. {score:>6}  length {length:>5}  {duration:>7.1f} s  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(played_at))}")
+    print("  ".join(f"p{round(fraction * 100)} {score}"
+                    for fraction, score in store.percentiles(*settings, **board).items()))
+    store.close()
@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import heapq
+import json
+import struct
+import zlib
+from array import array
+from collections import deque
+
+from engine import SnakeEngine, Difficulty, OPPOSITE, GRID_WIDTH, GRID_HEIGHT
+from replay import DIRECTIONS, DIRECTION_CODES, FLAG_OBSTACLES, FLAG_SPECIAL_FOOD
+
+# Authoritative game server: many rooms, each running one SnakeEngine at
+# its difficulty's tick rate, all driven by one scheduler (a heap of the
+# time each room is next due). Clients connect over TCP, join a room by
+# name, send turns and get the changed cells after every tick, collected
+# from the engine's cell watchers, instead of whole boards.
+#
+# Every message is a little-endian u32 length followed by that many bytes,
+# the first of which is the message type:
+#
+#   client -> server
+#     J  join: difficulty (ticks/sec), flags (replay.FLAG_*), width and height
+#        (0 for the default), then the room name in UTF-8
+#     D  turn: direction code (replay.DIRECTION_CODES)
+#     Q  ask for server stats
+#     R  ask for server stats and start them over (ticks, jitter, bytes and
+#        dropped clients then cover only what happens after it)
+#   server -> client
+#     S  snapshot, sent on joining and when a room restarts: tick, score,
+#        width, height, direction code, body length, the body cells (u32,
+#        head first), then the zlib-compressed grid
+#     T  tick: tick, score, game over, change count, then a cell (u32) and
+#        its new code (u8) for every cell that changed
+#     Q  stats as JSON, in answer to Q or R
+#
+# The first client in a room steers; later ones watch and take over in
+# the order they joined.
+
+DEFAULT_PORT = 7777
+FRAME = struct.Struct("<I")
+JOIN = struct.Struct("<BBHH")
+SNAPSHOT = struct.Struct("<IIHHBI")
+TICK = struct.Struct("<IIBH")
+CHANGE = struct.Struct("<IB")
+
+MSG_JOIN = b"J"
+MSG_TURN = b"D"
+MSG_STATS = b"Q"
+MSG_RESET_STATS = b"R"
+MSG_SNAPSHOT = b"S"
+MSG_TICK = b"T"
+
+MAX_MESSAGE = 1024  # longest message accepted from a client
+MIN_SIZE = 8
+MAX_SIZE = 1000
+RESTART_SECONDS = 2  # a finished game restarts after this long
+INPUT_QUEUE_SIZE = 3
+# A room this many ticks late skips ahead instead of catching up
+MAX_LAG_TICKS = 3
+# Longest the scheduler sleeps, so rooms created meanwhile start on time
+MAX_SLEEP = 0.005
+# Sleeps wake up late by up to a millisecond, so rooms due within this
+# long are run early instead
+TICK_SLACK = 0.001
+# Bytes queued for a client before it is dropped as too slow
+MAX_BUFFERED = 256 * 1024
+JITTER_SAMPLES = 100000
+
+def framed(message):
+    return FRAME.pack(len(message)) + message
+
+async def read_message(reader):
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return await reader.readexactly(length)
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of a sorted list
+    if not ordered:
+        return 0.0
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+class Room:
+    def __init__(self, name, difficulty, flags, width, height):
+        self.name = name
+        self.engine = SnakeEngine(width, height, difficulty, bool(flags & FLAG_OBSTACLES),
+                                  bool(flags & FLAG_SPECIAL_FOOD))
+        self.engine.reset()
+        # Cells changed since the last broadcast
+        self.changes = set()
+        self.engine.watch(self)
+        self.clients = []
+        self.turns = deque()
+        self.restart_ticks = 0
+        self.closed = False
+
+    def add(self, cell):
+        self.changes.add(cell)
+
+    def tick_length(self):
+        engine = self.engine
+        return 1.0 / (engine.difficulty.value * engine.speed_modifier)
+
+    def queue_turn(self, direction):
+        # Same buffering as the local game: each turn is checked against the
+        # one queued before it
+        last = self.turns[-1] if self.turns else self.engine.direction
+        if direction != last and direction != OPPOSITE[last] and len(self.turns) < INPUT_QUEUE_SIZE:
+            self.turns.append(direction)
+
+    def snapshot(self):
+        engine = self.engine
+        width = engine.grid_width
+        body = array("I", (y * width + x for x, y in engine.snake_positions))
+        return (MSG_SNAPSHOT
+                + SNAPSHOT.pack(engine.tick, engine.score, width, engine.grid_height,
+                                DIRECTION_CODES[engine.direction], len(body))
+                + body.tobytes() + zlib.compress(bytes(engine.grid)))
+
+    def step(self):
+        # Advance one tick. Returns the message to broadcast, if any.
+        engine = self.engine
+        if engine.game_over:
+            self.restart_ticks -= 1
+            if self.restart_ticks > 0:
+                return None
+            engine.reset()
+            self.changes.clear()
+            self.turns.clear()
+            return self.snapshot()
+
+        engine.step(self.turns.popleft() if self.turns else None)
+        if engine.game_over:
+            self.restart_ticks = engine.seconds_to_ticks(RESTART_SECONDS)
+        grid = engine.grid
+        changes = self.changes
+        message = (MSG_TICK + TICK.pack(engine.tick, engine.score, engine.game_over, len(changes))
+                   + b"".join([CHANGE.pack(cell, grid[cell]) for cell in changes]))
+        changes.clear()
+        return message
+
+class SnakeServer:
+    def __init__(self):
+        self.rooms = {}
+        # (due time, insertion order, room); the order keeps rooms from
+        # ever being compared
+        self.heap = []
+        self.order = 0
+        self.clients = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        # How far from its due time each room tick ran, in seconds
+        self.jitter = deque(maxlen=JITTER_SAMPLES)
+        self.ticks = 0
+        # Broadcast messages and their size before being copied to each client
+        self.broadcasts = 0
+        self.broadcast_bytes = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+
+    def schedule(self, room, due):
+        heapq.heappush(self.heap, (due, self.order, room))
+        self.order += 1
+
+    async def run_rooms(self):
+        loop = asyncio.get_running_loop()
+        heap = self.heap
+        while True:
+            delay = heap[0][0] - TICK_SLACK - loop.time() if heap else MAX_SLEEP
+            if delay > 0:
+                await asyncio.sleep(min(delay, MAX_SLEEP))
+                continue
+            now = loop.time()
+            while heap and heap[0][0] <= now + TICK_SLACK:
+                due, _, room = heapq.heappop(heap)
+                if room.closed:
+                    continue
+                started = loop.time()
+                self.jitter.append(abs(started - due))
+                self.ticks += 1
+                message = room.step()
+                if message is not None:
+                    self.broadcast(room, framed(message))
+                tick_length = room.tick_length()
+                due += tick_length
+                if due < started - MAX_LAG_TICKS * tick_length:
+                    due = started + tick_length
+                self.schedule(room, due)
+            # Let clients be served even when rooms are falling behind
+            await asyncio.sleep(0)
+
+    def broadcast(self, room, data):
+        self.broadcasts += 1
+        self.broadcast_bytes += len(data)
+        for writer in room.clients:
+            self.send(writer, data)
+
+    def send(self, writer, data):
+        transport = writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > MAX_BUFFERED:
+            # Can't keep up; dropping it beats buffering without bound
+            self.dropped += 1
+            transport.abort()
+            return
+        writer.write(data)
+        self.bytes_sent += len(data)
+
+    def join(self, writer, body):
+        difficulty_value, flags, width, height = JOIN.unpack_from(body)
+        name = body[JOIN.size:].decode("utf-8", "replace")
+        room = self.rooms.get(name)
+        if room is None:
+            try:
+                difficulty = Difficulty(difficulty_value)
+            except ValueError:
+                difficulty = Difficulty.MEDIUM
+            width = max(MIN_SIZE, min(width or GRID_WIDTH, MAX_SIZE))
+            height = max(MIN_SIZE, min(height or GRID_HEIGHT, MAX_SIZE))
+            room = self.rooms[name] = Room(name, difficulty, flags, width, height)
+            self.schedule(room, asyncio.get_running_loop().time() + room.tick_length())
+        room.clients.append(writer)
+        self.send(writer, framed(room.snapshot()))
+        return room
+
+    def leave(self, room, writer):
+        room.clients.remove(writer)
+        if not room.clients:
+            room.closed = True
+            del self.rooms[room.name]
+
+    async def handle_client(self, reader, writer):
+        room = None
+        self.clients += 1
+        try:
+            while True:
+                (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+                if not 0 < length <= MAX_MESSAGE:
+                    break
+                message = await reader.readexactly(length)
+                kind, body = message[:1], message[1:]
+                if kind == MSG_JOIN and room is None and len(body) >= JOIN.size:
+                    room = self.join(writer, body)
+                elif kind == MSG_TURN and room is not None and body and room.clients[0] is writer:
+                    room.queue_turn(DIRECTIONS[body[0] & 3])
+                elif kind in (MSG_STATS, MSG_RESET_STATS):
+                    self.send(writer, framed(MSG_STATS + json.dumps(self.stats()).encode()))
+                    if kind == MSG_RESET_STATS:
+                        self.reset_stats()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients -= 1
+            if room is not None:
+                self.leave(room, writer)
+            writer.close()
+
+    def stats(self):
+        jitter = sorted(self.jitter)
+        return {
+            "rooms": len(self.rooms),
+            "clients": self.clients,
+            "ticks": self.ticks,
+            "jitter_ms": {"p50": percentile(jitter, 0.50) * 1000,
+                          "p99": percentile(jitter, 0.99) * 1000,
+                          "max": jitter[-1] * 1000 if jitter else 0.0},
+            "bytes_per_tick": self.broadcast_bytes / self.broadcasts if self.broadcasts else 0.0,
+            "bytes_sent": self.bytes_sent,
+            "dropped_clients": self.dropped,
+        }
+
+async def report(server, interval):
+    while True:
+        await asyncio.sleep(interval)
+        stats = server.stats()
+        print(f"{stats['rooms']} rooms, {stats['clients']} clients, {stats['ticks']:,} ticks, "
+              f"jitter p50 {stats['jitter_ms']['p50']:.2f} ms p99 {stats['jitter_ms']['p99']:.2f} ms, "
+              f"{stats['bytes_per_tick']:.1f} bytes/tick", flush=True)
+
+async def serve(host, port, report_interval=0):
+    server = SnakeServer()
+    listener = await asyncio.start_server(server.handle_client, host, port, backlog=1024)
+    print(f"listening on {host}:{port}", flush=True)
+    tasks = [listener.serve_forever(), server.run_rooms()]
+    if report_interval:
+        tasks.append(report(server, report_interval))
+    async with listener:
+        await asyncio.gather(*tasks)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multiplayer snake server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--report", type=float, default=0, metavar="SECONDS",
+                        help="print stats this often")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.report))
+    except KeyboardInterrupt:
+        pass
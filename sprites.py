@@ -0,0 +1,157 @@
+import math
+from collections import OrderedDict
+
+import pygame
+
+from colors import (WHITE, BLACK, DARK_GRAY, GREEN, LIGHT_GREEN, DARK_GREEN, RED, GOLD, BLUE, PURPLE,
+                    OBSTACLE_GRAY, OBSTACLE_LINE)
+from engine import Direction, FoodType
+
+FOOD_COLORS = {
+    FoodType.REGULAR: RED,
+    FoodType.BONUS: GOLD,
+    FoodType.SPEED: BLUE,
+    FoodType.SLOW: PURPLE,
+}
+
+# The food pulse is a sine over now * 0.01; one period is split into this
+# many pre-rendered frames
+PULSE_BUCKETS = 24
+PULSE_PERIOD_MS = 2 * math.pi / 0.01
+
+def pulse_bucket(now):
+    return int(now % PULSE_PERIOD_MS / PULSE_PERIOD_MS * PULSE_BUCKETS)
+
+class LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return item
+
+    def put(self, key, item):
+        self.items[key] = item
+        self.items.move_to_end(key)
+        if len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def __len__(self):
+        return len(self.items)
+
+class SpriteCache:
+    # Pre-rendered text and cell graphics, so a frame is mostly blits.
+    # Text is keyed by (string, font, colour); cell sprites by what they show.
+    # Snake and food never sit on obstacles, so cell sprites are painted over
+    # the background tile and can be blitted as opaque cells.
+
+    def __init__(self, cell_size, max_text=256, max_sprites=256):
+        self.cell_size = cell_size
+        self.texts = LRUCache(max_text)
+        self.sprites = LRUCache(max_sprites)
+
+        # Background pattern
+        self.tile = pygame.Surface((cell_size, cell_size))
+        self.tile.fill(BLACK)
+        pygame.draw.rect(self.tile, DARK_GRAY, (1, 1, cell_size-2, cell_size-2))
+
+    def text(self, string, font, color):
+        key = (string, font, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = font.render(string, True, color)
+            self.texts.put(key, surface)
+        return surface
+
+    def cell_sprite(self, key, paint):
+        surface = self.sprites.get(key)
+        if surface is None:
+            surface = self.tile.copy()
+            paint(surface, *key[1:])
+            self.sprites.put(key, surface)
+        return surface
+
+    def food(self, food_type, bucket):
+        return self.cell_sprite(("food", food_type, bucket), self.paint_food)
+
+    def head(self, direction):
+        return self.cell_sprite(("head", direction), self.paint_head)
+
+    def segment(self, stripe):
+        return self.cell_sprite(("segment", stripe), self.paint_segment)
+
+    def obstacle(self):
+        return self.cell_sprite(("obstacle",), self.paint_obstacle)
+
+    def paint_food(self, surface, food_type, bucket):
+        size = self.cell_size
+        rect = surface.get_rect()
+        # Pulsing effect, sampled at the middle of the bucket
+        phase = (bucket + 0.5) / PULSE_BUCKETS * 2 * math.pi
+        pulse = (math.sin(phase) + 1) * 0.1 + 0.8
+        color = FOOD_COLORS[food_type]
+        color = (color[0]*pulse, color[1]*pulse, color[2]*pulse)
+
+        pygame.draw.ellipse(surface, color, rect)
+        if food_type == FoodType.BONUS:
+            pygame.draw.line(surface, WHITE, (size//2, 2), (size//2, size - 2), 2)
+            pygame.draw.line(surface, WHITE, (2, size//2), (size - 2, size//2), 2)
+        elif food_type == FoodType.SPEED:
+            # Add arrow symbol
+            arrow_points = [(size//2, 4), (size - 4, size//2), (size//2, size - 4)]
+            pygame.draw.polygon(surface, WHITE, arrow_points)
+        elif food_type == FoodType.SLOW:
+            # Add slow symbol
+            pygame.draw.rect(surface, WHITE, (4, size//2 - 2, size - 8, 4))
+
+    def paint_obstacle(self, surface):
+        size = self.cell_size
+        surface.fill(OBSTACLE_GRAY)
+        # Add some texture to obstacles
+        pygame.draw.line(surface, OBSTACLE_LINE, (0, 0), (size, size), 3)
+        pygame.draw.line(surface, OBSTACLE_LINE, (size, 0), (0, size), 3)
+
+    def paint_head(self, surface, direction):
+        size = self.cell_size
+        # The head fills its whole cell so it never spills into neighbours
+        pygame.draw.rect(surface, DARK_GREEN, surface.get_rect(), border_radius=4)
+
+        # Draw eyes based on direction
+        eye_size = size // 5
+        eye_offset_x = size // 3
+        eye_offset_y = size // 3
+
+        # Adjust eye positions based on direction
+        if direction == Direction.RIGHT:
+            left_eye = (size - eye_offset_x, eye_offset_y)
+            right_eye = (size - eye_offset_x, size - eye_offset_y)
+        elif direction == Direction.LEFT:
+            left_eye = (eye_offset_x, eye_offset_y)
+            right_eye = (eye_offset_x, size - eye_offset_y)
+        elif direction == Direction.UP:
+            left_eye = (eye_offset_x, eye_offset_y)
+            right_eye = (size - eye_offset_x, eye_offset_y)
+        else:  # DOWN
+            left_eye = (eye_offset_x, size - eye_offset_y)
+            right_eye = (size - eye_offset_x, size - eye_offset_y)
+
+        pygame.draw.circle(surface, WHITE, left_eye, eye_size)
+        pygame.draw.circle(surface, WHITE, right_eye, eye_size)
+
+        # Draw pupils
+        pygame.draw.circle(surface, BLACK, (left_eye[0] + eye_size//3, left_eye[1]), eye_size//2)
+        pygame.draw.circle(surface, BLACK, (right_eye[0] + eye_size//3, right_eye[1]), eye_size//2)
+
+    def paint_segment(self, surface, stripe):
+        # Alternate colors for body segments
+        color = GREEN if stripe == 0 else LIGHT_GREEN
+        # Draw rounded segments with connection gaps
+        pygame.draw.rect(surface, color, surface.get_rect().inflate(-2, -2), border_radius=3)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Every test imports the game's modules from the repository root, and
+# runs pygame without a real window or sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
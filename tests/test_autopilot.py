@@ -0,0 +1,56 @@
+from autopilot import Autopilot
+from engine import SnakeEngine, FoodType, EMPTY, OBSTACLE
+
+# No time pressure, so decisions don't depend on the machine
+BUDGET_US = 10**6
+
+def empty_board():
+    # The snake at (20, 15) heading right, and no food
+    engine = SnakeEngine(special_food_enabled=False, food_count=0)
+    engine.reset(1)
+    for pos in list(engine.foods):
+        engine.remove_food(pos)
+    return engine
+
+def cell(engine, pos):
+    return pos[1] * engine.grid_width + pos[0]
+
+def test_bonus_judged_by_its_own_expiry():
+    engine = empty_board()
+    # The near bonus is gone before the snake can get to it, the far one isn't
+    near, far = (23, 15), (20, 9)
+    engine.place_food(near, FoodType.BONUS)
+    engine.place_food(far, FoodType.BONUS)
+    engine.expiring_foods[near] = engine.tick + 1
+    autopilot = Autopilot(BUDGET_US)
+    autopilot.decide(engine)
+    assert autopilot.target == cell(engine, far)
+
+def test_new_bonus_replans():
+    engine = empty_board()
+    far = (20, 5)
+    engine.place_food(far, FoodType.BONUS)
+    autopilot = Autopilot(BUDGET_US)
+    engine.step(autopilot.decide(engine))
+    assert autopilot.target == cell(engine, far)
+    # A second bonus turns up right ahead of the snake
+    head_x, head_y = engine.snake_positions[0]
+    near = (head_x, head_y - 1)
+    engine.place_food(near, FoodType.BONUS)
+    autopilot.decide(engine)
+    assert autopilot.target == cell(engine, near)
+
+def test_growth_from_every_food_on_path():
+    engine = empty_board()
+    # A loop from the head round to just below the body, with food all the
+    # way: the snake grows into every free cell left and is shut in
+    loop = [(21, 15), (21, 16), (20, 16), (19, 16)]
+    for pos in loop:
+        engine.place_food(pos, FoodType.REGULAR)
+    for i in [i for i, code in enumerate(engine.grid) if code == EMPTY]:
+        engine.occupy(i, OBSTACLE)
+    autopilot = Autopilot(BUDGET_US)
+    head_x, head_y = engine.snake_positions[0]
+    autopilot.track(engine, cell(engine, (head_x, head_y)))
+    path = [cell(engine, pos) for pos in reversed(loop)]
+    assert not autopilot.is_safe(engine, path, float("inf"))
@@ -0,0 +1,17 @@
+import pygame
+
+from capture import FrameCapture, read_frames, stats
+
+def test_stats_count_drops_after_last_frame(tmp_path):
+    surface = pygame.Surface((64, 48), 0, 32)
+    path = str(tmp_path / "session.snkv")
+    # A one-frame queue and back-to-back captures, so most get dropped
+    capture = FrameCapture(path, surface, queue_frames=1)
+    for i in range(200):
+        surface.fill((i, 255 - i, 0))
+        capture.capture(surface)
+    capture.close()
+    assert capture.dropped > 0
+    frames, dropped, seconds = stats(path)
+    assert (frames, dropped) == (capture.written, capture.dropped)
+    assert sum(1 for _ in read_frames(path)) == capture.written
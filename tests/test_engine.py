@@ -0,0 +1,107 @@
+import hashlib
+import random
+
+import pytest
+
+from engine import SnakeEngine, Direction, Difficulty, OBSTACLE, SNAKE, FRENZY_FOOD_COUNT
+
+DIRECTIONS = list(Direction)
+
+def reachable(engine):
+    # Cells the head can get to without crossing an obstacle or the body,
+    # wrapping around the edges like the snake does
+    width, height = engine.grid_width, engine.grid_height
+    grid = engine.grid
+    head_x, head_y = engine.snake_positions[0]
+    start = head_y * width + head_x
+    seen = bytearray(len(grid))
+    seen[start] = 1
+    stack = [start]
+    while stack:
+        y, x = divmod(stack.pop(), width)
+        for cell in (y * width + (x + 1) % width, y * width + (x - 1) % width,
+                     (y + 1) % height * width + x, (y - 1) % height * width + x):
+            if not seen[cell] and grid[cell] != OBSTACLE and grid[cell] != SNAKE:
+                seen[cell] = 1
+                stack.append(cell)
+    return seen
+
+@pytest.mark.parametrize("food_count", [1, FRENZY_FOOD_COUNT])
+@pytest.mark.parametrize("width,height", [(40, 30), (65, 33), (41, 31)])
+def test_food_reachable_with_obstacles(width, height, food_count):
+    engine = SnakeEngine(width, height, obstacles_enabled=True, food_count=food_count)
+    for seed in range(100):
+        engine.reset(seed)
+        seen = reachable(engine)
+        walled_in = [pos for pos in engine.foods if not seen[pos[1] * width + pos[0]]]
+        assert not walled_in, f"seed {seed}: food at {walled_in} can't be reached"
+        assert len(engine.foods) == food_count
+
+def random_moves(seed, count):
+    rng = random.Random(seed)
+    return [rng.choice(DIRECTIONS) if rng.random() < 0.2 else None for _ in range(count)]
+
+def make_engine(seed):
+    # A spread of settings: board size, difficulty, obstacles, frenzy food,
+    # and more special and bonus food than usual
+    engine = SnakeEngine(40 + seed % 7 * 20, 30 + seed % 5 * 10, list(Difficulty)[seed % 3],
+                         seed % 2 == 0, True, FRENZY_FOOD_COUNT if seed % 3 == 0 else 1)
+    if seed % 4 == 0:
+        engine.bonus_chance = 0.05
+    if seed % 5 == 0:
+        engine.special_food_chance = 0.6
+    return engine
+
+def state(engine):
+    return (engine.tick, engine.score, engine.game_over, bytes(engine.grid), list(engine.snake_positions),
+            dict(engine.foods), dict(engine.expiring_foods), engine.speed_modifier,
+            engine.speed_effect_time, list(engine.chunk_free), list(engine.row_free), engine.free_count,
+            engine.direction, engine.last_tail, engine.rng.getstate())
+
+# Hash of the games played by test_seeded_games_unchanged. It only changes
+# when the engine plays the same seed and moves out differently; when it
+# does, bump replay.VERSION (old replays no longer play back) and update it.
+STATE_HASH = "1e863ad6f7c8f9ca63ae02df19354bd11b63c56aecf843cf9ad0b473154565d2"
+
+def test_seeded_games_unchanged():
+    digest = hashlib.sha256()
+    for seed in range(40):
+        engine = make_engine(seed)
+        engine.reset(seed)
+        for move in random_moves(seed, 2000):
+            engine.step(move)
+            digest.update(repr((engine.tick, engine.score, engine.speed_modifier, engine.speed_effect_time,
+                                sorted(engine.expiring_foods.items()), len(engine.foods))).encode())
+            if engine.game_over:
+                break
+        digest.update(bytes(engine.grid))
+    assert digest.hexdigest() == STATE_HASH
+
+def test_snapshot_restore():
+    for seed in range(30):
+        engine = make_engine(seed)
+        engine.reset(seed)
+        moves = random_moves(seed, 1500)
+        cut = seed * 7 % 300 + 1
+        for move in moves[:cut]:
+            engine.step(move)
+        snapshot = engine.snapshot()
+        for move in moves[cut:]:
+            engine.step(move)
+        final = state(engine)
+        for wander in range(2):
+            # Play something else, then go back and replay the same moves
+            for move in random_moves(seed + 1000 + wander, 50):
+                engine.step(move)
+            engine.restore(snapshot)
+            for move in moves[cut:]:
+                engine.step(move)
+            assert state(engine) == final, f"seed {seed}"
+
+def test_restore_other_board_size():
+    engine = SnakeEngine(40, 30)
+    engine.reset(1)
+    other = SnakeEngine(41, 30)
+    other.reset(1)
+    with pytest.raises(ValueError):
+        engine.restore(other.snapshot())
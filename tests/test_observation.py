@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from engine import SnakeEngine, Direction, Difficulty, FRENZY_FOOD_COUNT
+from observation import BoardObservation, HEAD, BODY, OBSTACLES, FOOD_PLANES, ORDER, PLANES
+
+DIRECTIONS = list(Direction)
+
+def from_scratch(engine):
+    # The planes built cell by cell from the engine's state
+    width, height = engine.grid_width, engine.grid_height
+    planes = np.zeros((PLANES, height, width), dtype=np.uint8)
+    for i, (x, y) in enumerate(engine.snake_positions):
+        planes[BODY, y, x] = 1
+        planes[ORDER, y, x] = (engine.tick - i) & 0xFF
+    if engine.snake_positions:
+        x, y = engine.snake_positions[0]
+        planes[HEAD, y, x] = 1
+    for cell in engine.obstacle_cells():
+        planes[OBSTACLES, cell // width, cell % width] = 1
+    for (x, y), (food_type, _) in engine.foods.items():
+        planes[FOOD_PLANES[food_type], y, x] = 1
+    return planes
+
+def test_matches_from_scratch():
+    for seed in range(20):
+        engine = SnakeEngine(40 + seed % 3 * 20, 30, list(Difficulty)[seed % 3], seed % 2 == 0, True,
+                             FRENZY_FOOD_COUNT if seed % 4 == 0 else 1)
+        engine.bonus_chance = 0.05
+        engine.reset(seed)
+        observation = BoardObservation(engine)
+        view = observation.view()
+        assert not view.flags.writeable
+        rng = random.Random(seed)
+        snapshot = None
+        for t in range(1000):
+            engine.step(rng.choice(DIRECTIONS) if rng.random() < 0.2 else None)
+            # Restores and resets rebuild the planes
+            if t == 200:
+                snapshot = engine.snapshot()
+            if t == 400:
+                engine.restore(snapshot)
+            if engine.game_over:
+                engine.reset(seed * 1000 + t)
+            if t % 3 == 0:
+                assert observation.view() is view
+                assert np.array_equal(view, from_scratch(engine)), f"seed {seed}, step {t}"
+        observation.close()
+        assert observation not in engine.watchers
+
+def test_view_before_reset():
+    engine = SnakeEngine()
+    observation = BoardObservation(engine)
+    assert not observation.view().any()
+    engine.reset(1)
+    assert np.array_equal(observation.view(), from_scratch(engine))
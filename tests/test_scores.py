@@ -0,0 +1,80 @@
+import pytest
+
+from engine import SnakeEngine, Difficulty, FRENZY_FOOD_COUNT
+from scores import ScoreStore, HUMAN
+
+SETTINGS = (Difficulty.MEDIUM, False, True)
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.db"))
+    yield store
+    store.close()
+
+def finished_game(score, **kwargs):
+    engine = SnakeEngine(**kwargs)
+    engine.reset(1)
+    engine.score = score
+    return engine
+
+def runs(scores):
+    # (score, length, ticks, duration) for each score
+    return [(score, score // 10 + 3, score * 2, score / 10) for score in scores]
+
+def test_empty(store):
+    assert store.count(*SETTINGS) == 0
+    assert store.top(*SETTINGS) == []
+    assert store.best() == 0
+    assert store.percentiles(*SETTINGS, fractions=[0.5]) == {0.5: 0}
+
+def test_record(store):
+    for score in [30, 10, 20]:
+        store.record(finished_game(score), 1.5)
+    assert store.count(*SETTINGS) == 3
+    assert [run[0] for run in store.top(*SETTINGS)] == [30, 20, 10]
+    assert store.top(*SETTINGS, k=1)[0][:3] == (30, 3, 1.5)
+    assert store.best() == 30
+
+def test_record_many(store):
+    scores = [50, 10, 50, 30, 0]
+    store.record_many(HUMAN, *SETTINGS, runs(scores))
+    store.record_many(HUMAN, *SETTINGS, runs([20]))
+    assert store.count(*SETTINGS) == 6
+    assert [run[0] for run in store.top(*SETTINGS, k=4)] == [50, 50, 30, 20]
+    assert store.top(*SETTINGS, k=1)[0][:3] == (50, 8, 5.0)
+    assert store.best() == 50
+
+def test_settings_kept_apart(store):
+    store.record_many(HUMAN, *SETTINGS, runs([10]))
+    store.record_many("autopilot", *SETTINGS, runs([500]))
+    store.record_many(HUMAN, Difficulty.HARD, True, False, runs([40]))
+    store.record_many(HUMAN, *SETTINGS, runs([70]), food_count=FRENZY_FOOD_COUNT)
+    store.record(finished_game(90, grid_width=60, grid_height=40), 2.0)
+    assert store.count(*SETTINGS) == 1
+    assert store.count(*SETTINGS, player="autopilot") == 1
+    assert store.count(*SETTINGS, width=60, height=40) == 1
+    assert store.top(*SETTINGS, food_count=FRENZY_FOOD_COUNT)[0][0] == 70
+    # The best human game on the board, over every difficulty and setting,
+    # but only with the same food count
+    assert store.best() == 40
+    assert store.best(food_count=FRENZY_FOOD_COUNT) == 70
+    assert store.best(width=60, height=40) == 90
+    assert store.best("autopilot") == 500
+
+def test_percentiles(store):
+    store.record_many(HUMAN, *SETTINGS, runs(range(10, 101, 10)))
+    assert store.percentiles(*SETTINGS, fractions=[0.1, 0.5, 0.9, 0.99]) == {
+        0.1: 10, 0.5: 50, 0.9: 90, 0.99: 100}
+    # Repeated scores count once per run
+    store.record_many(HUMAN, *SETTINGS, runs([10] * 10))
+    assert store.percentiles(*SETTINGS, fractions=[0.5, 0.6]) == {0.5: 10, 0.6: 20}
+
+def test_reopen(tmp_path):
+    path = str(tmp_path / "scores.db")
+    store = ScoreStore(path)
+    store.record_many(HUMAN, *SETTINGS, runs([10, 20]))
+    store.close()
+    store = ScoreStore(path)
+    assert store.count(*SETTINGS) == 2
+    assert store.best() == 20
+    store.close()
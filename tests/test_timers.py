@@ -0,0 +1,80 @@
+from timers import TimerWheel, WHEEL_SLOTS
+
+def test_fires_in_tick_order():
+    wheel = TimerWheel(8)
+    for tick, event in [(3, "c"), (1, "a"), (3, "d"), (2, "b")]:
+        wheel.schedule(tick, event)
+    assert len(wheel) == 4
+    assert wheel.advance(1) == ["a"]
+    # Within a tick, in the order they were scheduled
+    assert wheel.advance(3) == ["b", "c", "d"]
+    assert len(wheel) == 0
+    assert wheel.advance(10) == []
+    assert wheel.now == 10
+
+def test_past_fires_next_tick():
+    wheel = TimerWheel(8)
+    wheel.advance(5)
+    wheel.schedule(2, "late")
+    wheel.schedule(5, "now")
+    assert wheel.advance(5) == []
+    assert wheel.advance(6) == ["late", "now"]
+
+def test_overflow_moves_onto_wheel():
+    wheel = TimerWheel(8)
+    # Beyond one turn of the wheel, and several turns out
+    wheel.schedule(20, "far")
+    wheel.schedule(8, "edge")
+    wheel.schedule(7, "near")
+    wheel.schedule(35, "farther")
+    assert len(wheel.overflow) == 3
+    assert wheel.advance(7) == ["near"]
+    assert wheel.advance(8) == ["edge"]
+    # Scheduled as soon as "far" is on the wheel, so it fires after it
+    wheel.advance(13)
+    wheel.schedule(20, "same tick")
+    assert wheel.advance(19) == []
+    assert wheel.advance(20) == ["far", "same tick"]
+    assert wheel.advance(100) == ["farther"]
+    assert not wheel.overflow and len(wheel) == 0
+
+def test_default_wheel_size():
+    wheel = TimerWheel()
+    wheel.schedule(WHEEL_SLOTS - 1, "on the wheel")
+    wheel.schedule(WHEEL_SLOTS, "beyond it")
+    assert [event for _, _, event in wheel.overflow] == ["beyond it"]
+    assert wheel.advance(WHEEL_SLOTS) == ["on the wheel", "beyond it"]
+
+def test_skips_ahead_when_empty():
+    wheel = TimerWheel(8)
+    wheel.advance(1000)
+    wheel.schedule(1003, "a")
+    assert wheel.advance(1002) == []
+    assert wheel.advance(1003) == ["a"]
+
+def test_events_in_firing_order():
+    wheel = TimerWheel(8)
+    wheel.advance(3)
+    for tick, event in [(30, "f"), (5, "b"), (4, "a"), (12, "e"), (5, "c"), (40, "h"), (10, "d"), (30, "g")]:
+        wheel.schedule(tick, event)
+    pending = wheel.events()
+    assert pending == [(4, "a"), (5, "b"), (5, "c"), (10, "d"), (12, "e"), (30, "f"), (30, "g"), (40, "h")]
+    # Scheduling them again on a cleared wheel gives the same one
+    copy = TimerWheel(8)
+    copy.clear(wheel.now)
+    for tick, event in pending:
+        copy.schedule(tick, event)
+    assert copy.events() == pending
+    fired = [(tick, event) for tick in range(4, 41) for event in wheel.advance(tick)]
+    assert fired == pending
+    assert [event for tick in range(4, 41) for event in copy.advance(tick)] == [event for _, event in pending]
+
+def test_clear():
+    wheel = TimerWheel(8)
+    wheel.schedule(2, "a")
+    wheel.schedule(50, "b")
+    wheel.clear(40)
+    assert len(wheel) == 0
+    assert wheel.events() == []
+    assert wheel.now == 40
+    assert wheel.advance(60) == []
@@ -0,0 +1,73 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from engine import SnakeEngine, FOOD_BY_CODE, FOOD_BASE, FoodType
+from vec_env import VecSnakeEnv, ACTIONS
+
+GAMES = 32
+STEPS = 3000
+TURN_CHANCE = 0.1
+
+def sync_food(engine, board):
+    # Food is placed by different random generators, so the engine is given
+    # whatever food the vector env placed; everything else must then agree
+    codes = bytes(board)
+    for pos in list(engine.foods):
+        cell = pos[1] * engine.grid_width + pos[0]
+        if codes[cell] != engine.grid[cell]:
+            engine.remove_food(pos)
+    for cell in np.flatnonzero(board > FOOD_BASE):
+        cell = int(cell)
+        if engine.grid[cell] != codes[cell]:
+            engine.place_food((cell % engine.grid_width, cell // engine.grid_width), FOOD_BY_CODE[codes[cell]])
+
+def test_matches_engine():
+    env = VecSnakeEnv(GAMES, seed=1)
+    engines = [SnakeEngine() for _ in range(GAMES)]
+    for engine in engines:
+        engine.reset(0)
+    for engine, board in zip(engines, env.grid):
+        sync_food(engine, board)
+    rng = np.random.default_rng(2)
+    live = np.ones(GAMES, dtype=bool)
+    seen = {"grown": 0, "crashed": 0, "wrapped": 0, "bonus expired": 0, "effects": 0}
+    for _ in range(STEPS):
+        actions = np.where(rng.random(GAMES) < TURN_CHANCE, rng.integers(0, len(ACTIONS), size=GAMES), -1)
+        bonus_before = env.bonus_cell.copy()
+        _, dones = env.step(actions)
+        for i in np.flatnonzero(live):
+            engine = engines[i]
+            head = engine.snake_positions[0]
+            engine.step(ACTIONS[actions[i]] if actions[i] >= 0 else None)
+            assert engine.game_over == dones[i]
+            if dones[i]:
+                # The env has already started a new game on this board
+                assert (engine.score, len(engine.snake_positions)) == (env.final_score[i], env.final_length[i])
+                seen["crashed"] += 1
+                live[i] = False
+                continue
+            new_head = engine.snake_positions[0]
+            seen["wrapped"] += abs(new_head[0] - head[0]) + abs(new_head[1] - head[1]) > 1
+            seen["grown"] += engine.last_tail is None
+            seen["effects"] += engine.speed_effect_time > 0
+            seen["bonus expired"] += (bonus_before[i] >= 0 and env.bonus_cell[i] < 0
+                                      and env.grid[i, bonus_before[i]] == 0)
+            assert engine.score == env.score[i]
+            assert len(engine.snake_positions) == env.length[i]
+            assert engine.speed_modifier == pytest.approx(env.speed_modifier[i])
+            assert engine.speed_effect_time == env.speed_effect_time[i]
+            # Every board keeps food on it, and the env's count is right
+            assert env.foods_alive[i] == np.count_nonzero(env.grid[i] > FOOD_BASE) >= 1
+            sync_food(engine, env.grid[i])
+            assert bytes(engine.grid) == env.grid[i].tobytes()
+            # A bonus placed by the env expires on the same tick in both
+            if env.bonus_cell[i] >= 0:
+                cell = int(env.bonus_cell[i])
+                pos = (cell % engine.grid_width, cell // engine.grid_width)
+                assert engine.foods[pos][0] == FoodType.BONUS
+                assert engine.expiring_foods[pos] == env.bonus_expire[i]
+        if not live.any():
+            break
+    # The run went through every rule being compared
+    assert all(seen.values()), seen
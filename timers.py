@@ -0,0 +1,80 @@
+import heapq
+
+# Events keyed on simulation ticks. A timer wheel: one slot per tick for
+# the next WHEEL_SLOTS ticks, so scheduling an event and firing the ones
+# that are due cost O(1) however many are pending. Events further out wait
+# in a heap and move onto the wheel as their tick comes within reach.
+#
+# Time only moves when advance() is called, i.e. when the game steps, so a
+# paused game or one simulated faster than real time fires its events on
+# the same ticks. Nothing is ever removed early: an event that no longer
+# applies (its food was eaten, its effect was renewed) is just ignored by
+# whoever handles it when it fires.
+
+WHEEL_SLOTS = 256  # a power of two
+
+class TimerWheel:
+    def __init__(self, slots=WHEEL_SLOTS):
+        self.slots = [[] for _ in range(slots)]
+        self.mask = slots - 1
+        # (tick, insertion order, event) for events beyond the wheel
+        self.overflow = []
+        self.order = 0
+        self.now = 0
+        self.pending = 0
+
+    def __len__(self):
+        return self.pending
+
+    def clear(self, now=0):
+        if self.pending:
+            for slot in self.slots:
+                slot.clear()
+            self.overflow.clear()
+            self.pending = 0
+        self.now = now
+
+    def schedule(self, tick, event):
+        # Fire `event` when advance() reaches `tick` (the next tick at the
+        # earliest)
+        tick = max(tick, self.now + 1)
+        self.pending += 1
+        if tick - self.now <= self.mask:
+            self.slots[tick & self.mask].append(event)
+        else:
+            heapq.heappush(self.overflow, (tick, self.order, event))
+            self.order += 1
+
+    def events(self):
+        # Pending (tick, event) pairs in the order they will fire; scheduling
+        # them again on a cleared wheel recreates this one
+        if not self.pending:
+            return []
+        now, mask = self.now, self.mask
+        pending = [(now + offset, event) for offset in range(1, mask + 1)
+                   for event in self.slots[(now + offset) & mask]]
+        pending.extend((tick, event) for tick, _, event in sorted(self.overflow))
+        return pending
+
+    def advance(self, tick):
+        # Move time on to `tick` and return the events due by then, in tick
+        # order and, within a tick, in the order they were scheduled
+        fired = []
+        slots, mask, overflow = self.slots, self.mask, self.overflow
+        while self.now < tick:
+            self.now += 1
+            # Events now within one turn of the wheel move onto it; their
+            # slot is still ahead of anything scheduled for the same tick
+            while overflow and overflow[0][0] - self.now <= mask:
+                due, _, event = heapq.heappop(overflow)
+                slots[due & mask].append(event)
+            if not self.pending:
+                # Nothing anywhere: skip straight to the end
+                self.now = tick
+                break
+            slot = slots[self.now & mask]
+            if slot:
+                fired.extend(slot)
+                self.pending -= len(slot)
+                slot.clear()
+        return fired
@@ -0,0 +1,268 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from array import array
+
+from autopilot import Autopilot, neighbours, wrapped_distance, MOVES
+from engine import (SnakeEngine, Difficulty, SNAKE, OBSTACLE, SPECIAL_FOOD_CHANCE, BONUS_CHANCE,
+                    GRID_WIDTH, GRID_HEIGHT)
+from scores import ScoreStore
+
+# Plays seeded headless games across a process pool and aggregates score,
+# length and survival time for every combination of settings, e.g. to tune
+# the special food and bonus chances:
+#
+#   python tournament.py --games 100000 --special-chance 0.1 0.2 0.3 --output results.json
+#
+# Every settings combination plays the same seeds, so differences between
+# them come from the settings rather than from the luck of the draw. Workers
+# get games in batches and send results back as packed integers, so the
+# pool scales with the number of cores.
+
+BATCH_SIZE = 200
+# score, length, ticks, crashed (0 when the tick limit ended the game)
+RESULT_FIELDS = 4
+HISTOGRAM_BINS = 20
+# Moves with their offsets (Enum .value lookups are slow in a hot loop)
+STEPS = [(move, move.value[0], move.value[1]) for move in MOVES]
+
+class GreedyPolicy:
+    # Heads for the nearest food (ignoring walls), never moving into a cell
+    # that kills it outright. A few microseconds per decision.
+
+    def __init__(self):
+        self.target = None
+
+    def forget(self):
+        self.target = None
+
+    def decide(self, engine):
+        width, height = engine.grid_width, engine.grid_height
+        head_x, head_y = engine.snake_positions[0]
+        grid = engine.grid
+        if self.target not in engine.foods:
+            head = head_y * width + head_x
+            foods = [y * width + x for x, y in engine.foods]
+            if not foods:
+                self.target = None
+                return engine.direction
+            cell = min(foods, key=lambda cell: wrapped_distance(head, cell, width, height))
+            self.target = (cell % width, cell // width)
+        target_x, target_y = self.target
+
+        best, best_distance = engine.direction, None
+        for move, dx, dy in STEPS:
+            x, y = (head_x + dx) % width, (head_y + dy) % height
+            code = grid[y * width + x]
+            if code == SNAKE or code == OBSTACLE:
+                continue
+            # Wrapped distance, without min() (too slow per call here)
+            far_x, far_y = abs(x - target_x), abs(y - target_y)
+            if far_x > width - far_x:
+                far_x = width - far_x
+            if far_y > height - far_y:
+                far_y = height - far_y
+            distance = far_x + far_y
+            if best_distance is None or distance < best_distance:
+                best, best_distance = move, distance
+        return best
+
+class RandomPolicy:
+    # A random move that doesn't die on the spot, from its own generator
+    # (seeded from the game's seed, so the game's own draws are untouched)
+
+    def __init__(self):
+        self.rng = random.Random()
+        self.seed = None
+
+    def forget(self):
+        self.seed = None
+
+    def decide(self, engine):
+        if self.seed != engine.seed:
+            self.seed = engine.seed
+            self.rng.seed(engine.seed)
+        width, height = engine.grid_width, engine.grid_height
+        head_x, head_y = engine.snake_positions[0]
+        grid = engine.grid
+        moves = [move for move, cell in zip(MOVES, neighbours(head_y * width + head_x, width, height))
+                 if grid[cell] != SNAKE and grid[cell] != OBSTACLE]
+        return self.rng.choice(moves) if moves else engine.direction
+
+def make_policy(name, budget_us):
+    if name == "autopilot":
+        return Autopilot(budget_us)
+    if name == "random":
+        return RandomPolicy()
+    return GreedyPolicy()
+
+def play(engine, policy, seed, max_ticks):
+    # One game; returns (score, length, ticks, crashed)
+    engine.reset(seed)
+    policy.forget()
+    step = engine.step
+    decide = policy.decide
+    while not engine.game_over and engine.tick < max_ticks:
+        step(decide(engine))
+    return engine.score, len(engine.snake_positions), engine.tick, int(engine.game_over)
+
+# Per-worker engines and policies, reused across batches
+_engines = {}
+_policies = {}
+
+def play_batch(task):
+    # Runs in a worker: plays the seeds of one batch under one settings
+    # combination and returns the results packed as int32s
+    index, settings, seeds, policy_name, budget_us, max_ticks = task
+    engine = _engines.get(settings)
+    if engine is None:
+        difficulty, obstacles, special_food, special_chance, bonus_chance, width, height = settings
+        engine = _engines[settings] = SnakeEngine(width, height, Difficulty[difficulty],
+                                                  obstacles, special_food)
+        engine.special_food_chance = special_chance
+        engine.bonus_chance = bonus_chance
+    policy = _policies.get(policy_name)
+    if policy is None:
+        policy = _policies[policy_name] = make_policy(policy_name, budget_us)
+
+    results = array("i")
+    for seed in seeds:
+        results.extend(play(engine, policy, seed, max_ticks))
+    return index, results.tobytes()
+
+def label(settings):
+    difficulty, obstacles, special_food, special_chance, bonus_chance, width, height = settings
+    return (f"{difficulty.lower()} {width}x{height} obstacles={'on' if obstacles else 'off'} "
+            f"special={special_chance if special_food else 'off'} bonus={bonus_chance if special_food else 'off'}")
+
+def distribution(values):
+    ordered = sorted(values)
+    count = len(ordered)
+    mean = sum(ordered) / count
+    return {
+        "mean": mean,
+        "std": (sum((v - mean) ** 2 for v in ordered) / count) ** 0.5,
+        "p10": ordered[count // 10],
+        "p50": ordered[count // 2],
+        "p90": ordered[min(count - 1, count * 9 // 10)],
+        "p99": ordered[min(count - 1, count * 99 // 100)],
+        "max": ordered[-1],
+    }
+
+def histogram(values, bins=HISTOGRAM_BINS):
+    # Equal-width bins from 0 to the largest value: (bin width, counts)
+    width = max(1, -(-(max(values) + 1) // bins))
+    counts = [0] * bins
+    for value in values:
+        counts[min(value // width, bins - 1)] += 1
+    return width, counts
+
+def summarize(settings, results):
+    scores = results[0::RESULT_FIELDS]
+    lengths = results[1::RESULT_FIELDS]
+    ticks = results[2::RESULT_FIELDS]
+    crashed = results[3::RESULT_FIELDS]
+    rate = Difficulty[settings[0]].value
+    score_bin, score_counts = histogram(scores)
+    return {
+        "settings": dict(zip(["difficulty", "obstacles", "special_food", "special_food_chance",
+                              "bonus_chance", "width", "height"], settings)),
+        "games": len(scores),
+        "crash_rate": sum(crashed) / len(crashed),
+        "score": distribution(scores),
+        "length": distribution(lengths),
+        # At the base tick rate; speed effects are not counted
+        "survival_seconds": {key: value / rate for key, value in distribution(ticks).items()},
+        "score_histogram": {"bin_width": score_bin, "counts": score_counts},
+    }
+
+def run(combinations, games, seed, policy, budget_us, max_ticks, workers, batch_size):
+    # Returns one flat int array of results per settings combination
+    tasks = [(index, settings, range(start, min(start + batch_size, seed + games)),
+              policy, budget_us, max_ticks)
+             for start in range(seed, seed + games, batch_size)
+             for index, settings in enumerate(combinations)]
+    results = [array("i") for _ in combinations]
+    total_games = games * len(combinations)
+    done = 0
+    started = time.perf_counter()
+
+    if workers == 1:
+        batches = map(play_batch, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        batches = pool.imap_unordered(play_batch, tasks)
+    try:
+        for index, packed in batches:
+            results[index].frombytes(packed)
+            done += len(packed) // (4 * RESULT_FIELDS)
+            elapsed = time.perf_counter() - started
+            print(f"\r{done:,}/{total_games:,} games, {done / elapsed:,.0f} games/sec", end="", flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mass headless games for balancing")
+    parser.add_argument("--games", type=int, default=10000, help="games per settings combination")
+    parser.add_argument("--seed", type=int, default=0, help="first game seed")
+    parser.add_argument("--policy", choices=["greedy", "autopilot", "random"], default="greedy")
+    parser.add_argument("--budget-us", type=int, default=100000,
+                        help="autopilot time budget per decision (large keeps results reproducible)")
+    parser.add_argument("--max-ticks", type=int, default=10000, help="end a game after this many ticks")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="games per batch sent to a worker")
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--difficulty", nargs="+", default=["medium"],
+                        choices=["easy", "medium", "hard"])
+    parser.add_argument("--obstacles", nargs="+", default=["off"], choices=["off", "on"])
+    parser.add_argument("--special-food", nargs="+", default=["on"], choices=["off", "on"])
+    parser.add_argument("--special-chance", nargs="+", type=float, default=[SPECIAL_FOOD_CHANCE])
+    parser.add_argument("--bonus-chance", nargs="+", type=float, default=[BONUS_CHANCE])
+    parser.add_argument("--output", metavar="FILE", help="write the summaries as JSON")
+    parser.add_argument("--scores", metavar="DB", help="also add every game to this score store "
+                        "(default special food and bonus chances only)")
+    args = parser.parse_args()
+    # The store keys runs by the settings the game has, and the game always
+    # plays the default chances, so other chances would be mixed in with them
+    if args.scores and (args.special_chance != [SPECIAL_FOOD_CHANCE] or args.bonus_chance != [BONUS_CHANCE]):
+        parser.error("--scores can't be used with --special-chance or --bonus-chance other than the defaults")
+
+    combinations = [(difficulty.upper(), obstacles == "on", special == "on", special_chance,
+                     bonus_chance, args.width, args.height)
+                    for difficulty, obstacles, special, special_chance, bonus_chance in itertools.product(
+                        args.difficulty, args.obstacles, args.special_food,
+                        args.special_chance, args.bonus_chance)]
+    results = run(combinations, args.games, args.seed, args.policy, args.budget_us,
+                  args.max_ticks, args.workers, args.batch)
+
+    summaries = [summarize(settings, result) for settings, result in zip(combinations, results)]
+    print(f"{'settings':<58} {'score mean':>10} {'p50':>6} {'p90':>6} {'length':>7} {'seconds':>8} {'crash':>6}")
+    for settings, summary in zip(combinations, summaries):
+        print(f"{label(settings):<58} {summary['score']['mean']:>10.1f} {summary['score']['p50']:>6} "
+              f"{summary['score']['p90']:>6} {summary['length']['mean']:>7.1f} "
+              f"{summary['survival_seconds']['mean']:>8.1f} {summary['crash_rate']:>6.0%}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"policy": args.policy, "games": args.games, "seed": args.seed,
+                       "max_ticks": args.max_ticks, "results": summaries}, f, indent=2)
+    if args.scores:
+        store = ScoreStore(args.scores)
+        for settings, result in zip(combinations, results):
+            difficulty = Difficulty[settings[0]]
+            rate = difficulty.value
+            # score, length, ticks, duration at the base tick rate
+            runs = ((score, length, ticks, ticks / rate) for score, length, ticks in
+                    zip(result[0::RESULT_FIELDS], result[1::RESULT_FIELDS], result[2::RESULT_FIELDS]))
+            store.record_many(args.policy, difficulty, settings[1], settings[2], runs,
+                              width=settings[5], height=settings[6])
+        store.close()
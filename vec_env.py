@@ -0,0 +1,261 @@
+import random
+
+import numpy as np
+
+from engine import (GRID_WIDTH, GRID_HEIGHT, BONUS_FOOD_SECONDS, SPEED_EFFECT_SECONDS,
+                    SPECIAL_FOOD_CHANCE, BONUS_CHANCE, EMPTY, SNAKE, OBSTACLE, FOOD_BASE,
+                    PAGE_SIZE, PAGE_VARIETY, Direction, Difficulty, FoodType, make_page,
+                    spawn_corridor)
+
+# N games held in NumPy arrays and advanced together with one step() call.
+# The rules follow SnakeEngine: wrap-around movement, the four food types and
+# obstacle collision. Finished games are reset automatically.
+
+# Action indices accepted by VecSnakeEnv.step (-1 keeps the current direction)
+ACTIONS = [Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT]
+ACTION_DX = np.array([d.value[0] for d in ACTIONS], dtype=np.int64)
+ACTION_DY = np.array([d.value[1] for d in ACTIONS], dtype=np.int64)
+ACTION_OPPOSITE = np.array([1, 0, 3, 2], dtype=np.int64)
+
+# Cell codes are shared with the engine: food is FOOD_BASE + FoodType.value
+FOOD_CODES = {food_type: FOOD_BASE + food_type.value for food_type in FoodType}
+REGULAR_CODE = FOOD_CODES[FoodType.REGULAR]
+BONUS_CODE = FOOD_CODES[FoodType.BONUS]
+SPEED_CODE = FOOD_CODES[FoodType.SPEED]
+SLOW_CODE = FOOD_CODES[FoodType.SLOW]
+
+# Score gained for each cell code (only food cells score)
+CODE_SCORE = np.zeros(FOOD_BASE + len(FoodType) + 1, dtype=np.int64)
+CODE_SCORE[REGULAR_CODE] = 10
+CODE_SCORE[BONUS_CODE] = 50
+
+SPECIAL_CODES = np.array([BONUS_CODE, SPEED_CODE, SLOW_CODE], dtype=np.uint8)
+SPAWN_TRIES = 8
+
+
+class VecSnakeEnv:
+    def __init__(self, num_envs, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT,
+                 difficulty=Difficulty.MEDIUM, obstacles_enabled=False,
+                 special_food_enabled=True, seed=None):
+        self.num_envs = num_envs
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.num_cells = grid_width * grid_height
+        self.difficulty = difficulty
+        self.obstacles_enabled = obstacles_enabled
+        self.special_food_enabled = special_food_enabled
+        self.bonus_ticks = int(BONUS_FOOD_SECONDS * difficulty.value)
+        self.effect_ticks = int(SPEED_EFFECT_SECONDS * difficulty.value)
+
+        n, cells = num_envs, self.num_cells
+        self.env_ids = np.arange(n)
+        self.grid = np.zeros((n, cells), dtype=np.uint8)
+        # Snake bodies as ring buffers of cell indices; head_ptr points at the head
+        self.body = np.zeros((n, cells), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        # One timed bonus food per board, like the scalar rule that only rolls
+        # a new bonus when none is alive
+        self.bonus_cell = np.full(n, -1, dtype=np.int64)
+        self.foods_alive = np.zeros(n, dtype=np.int64)
+        self.bonus_expire = np.zeros(n, dtype=np.int64)
+        self.speed_modifier = np.ones(n, dtype=np.float32)
+        self.speed_effect_time = np.zeros(n, dtype=np.int64)
+
+        # Score and length of the games that ended on the last step
+        self.final_score = np.zeros(n, dtype=np.int64)
+        self.final_length = np.zeros(n, dtype=np.int64)
+
+        # Obstacle page library, (PAGE_VARIETY * 4, PAGE_SIZE, PAGE_SIZE)
+        self.pages = None
+        self.rng = np.random.default_rng(seed)
+        self.reset(seed)
+
+    @property
+    def boards(self):
+        # (N, height, width) view of the cell codes, no copy
+        return self.grid.reshape(self.num_envs, self.grid_height, self.grid_width)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+            self.pages = None
+        self._reset_envs(self.env_ids)
+
+    def _reset_envs(self, envs):
+        if len(envs) == 0:
+            return
+        w = self.grid_width
+        self.grid[envs] = EMPTY
+
+        # Initialize snake in the middle of the board, heading right
+        center = (self.grid_height // 2) * w + w // 2
+        initial = np.array([center - 2, center - 1, center], dtype=np.int32)
+        self.body[envs, :3] = initial
+        self.grid[envs[:, None], initial[None, :]] = SNAKE
+        self.head_ptr[envs] = 2
+        self.length[envs] = 3
+        self.direction[envs] = ACTIONS.index(Direction.RIGHT)
+
+        self.tick[envs] = 0
+        self.score[envs] = 0
+        self.bonus_cell[envs] = -1
+        self.bonus_expire[envs] = 0
+        self.foods_alive[envs] = 0
+        self.speed_modifier[envs] = 1.0
+        self.speed_effect_time[envs] = 0
+
+        if self.obstacles_enabled:
+            self._generate_obstacles(envs)
+        self._spawn_food(envs, np.full(len(envs), REGULAR_CODE, dtype=np.uint8))
+
+    def _generate_obstacles(self, envs):
+        # Same obstacle pages as SnakeEngine.generate_obstacles, tiled over
+        # every board at once. The page library is built on first use and
+        # shared by all boards.
+        if self.pages is None:
+            page_rng = random.Random(int(self.rng.integers(1 << 63)))
+            self.pages = np.array([[np.frombuffer(b"".join(rows), dtype=np.uint8)
+                                    .reshape(PAGE_SIZE, PAGE_SIZE)
+                                    for rows, _ in make_page(page_rng)]
+                                   for _ in range(PAGE_VARIETY)]).reshape(-1, PAGE_SIZE, PAGE_SIZE)
+        w, h = self.grid_width, self.grid_height
+        pages_x, pages_y = -(-w // PAGE_SIZE), -(-h // PAGE_SIZE)
+        picks = self.rng.integers(0, len(self.pages), size=(len(envs), pages_y, pages_x))
+        boards = (self.pages[picks].transpose(0, 1, 3, 2, 4)
+                  .reshape(len(envs), pages_y * PAGE_SIZE, pages_x * PAGE_SIZE)[:, :h, :w].copy())
+        x0, y0, x1, y1 = spawn_corridor(w, h)
+        boards[:, y0:y1, x0:x1] = EMPTY
+        boards = boards.reshape(len(envs), -1)
+        # Only empty cells take obstacles, so the snake is left alone
+        grid = self.grid[envs]
+        grid[(grid == EMPTY) & (boards == OBSTACLE)] = OBSTACLE
+        self.grid[envs] = grid
+
+    def _spawn_food(self, envs, codes):
+        # Rejection sampling in a few vectorized rounds, then an exact pick
+        # from the free cells for the boards that are too crowded
+        rng = self.rng
+        pending = np.arange(len(envs))
+        for _ in range(SPAWN_TRIES):
+            if len(pending) == 0:
+                break
+            cells = rng.integers(0, self.num_cells, size=len(pending))
+            free = self.grid[envs[pending], cells] == EMPTY
+            self._place_food(envs[pending[free]], cells[free], codes[pending[free]])
+            pending = pending[~free]
+
+        if len(pending):
+            free = self.grid[envs[pending]] == EMPTY
+            has_free = free.any(axis=1)
+            cells = np.argmax(rng.random(free.shape) * free, axis=1)
+            chosen = pending[has_free]
+            self._place_food(envs[chosen], cells[has_free], codes[chosen])
+
+    def _place_food(self, envs, cells, codes):
+        self.grid[envs, cells] = codes
+        self.foods_alive[envs] += 1
+        bonus = codes == BONUS_CODE
+        self.bonus_cell[envs[bonus]] = cells[bonus]
+        self.bonus_expire[envs[bonus]] = self.tick[envs[bonus]] + self.bonus_ticks
+
+    def _random_food_codes(self, count):
+        codes = np.full(count, REGULAR_CODE, dtype=np.uint8)
+        if self.special_food_enabled:
+            special = self.rng.random(count) < SPECIAL_FOOD_CHANCE
+            codes[special] = SPECIAL_CODES[self.rng.integers(0, 3, size=int(special.sum()))]
+        return codes
+
+    def step(self, actions):
+        # Advance every board by one tick. actions holds one index into
+        # ACTIONS per board (-1 keeps going straight). Returns (rewards, dones).
+        actions = np.asarray(actions, dtype=np.int64)
+        w, cells = self.grid_width, self.num_cells
+        ids = self.env_ids
+
+        # Reversing straight into the neck is ignored
+        turn = (actions >= 0) & (actions != ACTION_OPPOSITE[self.direction])
+        self.direction = np.where(turn, actions, self.direction)
+        self.tick += 1
+
+        # Calculate new head positions
+        head = self.body[ids, self.head_ptr]
+        new_x = (head % w + ACTION_DX[self.direction]) % w
+        new_y = (head // w + ACTION_DY[self.direction]) % self.grid_height
+        new_head = new_y * w + new_x
+
+        # Check for collisions with obstacles or self (the tail still counts)
+        content = self.grid[ids, new_head]
+        dones = (content == SNAKE) | (content == OBSTACLE)
+        alive = ids[~dones]
+        new_head = new_head[alive]
+        content = content[alive]
+
+        # Move snakes
+        self.head_ptr[alive] = (self.head_ptr[alive] + 1) % cells
+        self.body[alive, self.head_ptr[alive]] = new_head
+        self.grid[alive, new_head] = SNAKE
+
+        # Apply food effects
+        rewards = np.zeros(self.num_envs, dtype=np.int64)
+        rewards[alive] = CODE_SCORE[content]
+        self.score += rewards
+        ate = content > FOOD_BASE
+        grown = alive[ate]
+        self.length[grown] += 1
+        self.foods_alive[grown] -= 1
+
+        speed = content == SPEED_CODE
+        slow = content == SLOW_CODE
+        self.speed_modifier[alive[speed]] = 1.5
+        self.speed_modifier[alive[slow]] = 0.7
+        boosted = alive[speed | slow]
+        self.speed_effect_time[boosted] = self.tick[boosted] + self.effect_ticks
+        self.bonus_cell[alive[content == BONUS_CODE]] = -1
+
+        # Remove tails if no food was eaten
+        moved = alive[~ate]
+        tails = self.body[moved, (self.head_ptr[moved] - self.length[moved]) % cells]
+        self.grid[moved, tails] = EMPTY
+
+        # Add a new food for every board that ate
+        if len(grown):
+            codes = self._random_food_codes(len(grown))
+            # Only one timed bonus per board
+            codes[(codes == BONUS_CODE) & (self.bonus_cell[grown] >= 0)] = REGULAR_CODE
+            self._spawn_food(grown, codes)
+
+        # Check for expired bonus food
+        expired = ids[(self.bonus_cell >= 0) & (self.bonus_expire <= self.tick)]
+        self.grid[expired, self.bonus_cell[expired]] = EMPTY
+        self.bonus_cell[expired] = -1
+        self.foods_alive[expired] -= 1
+
+        # Add new bonus food occasionally
+        if self.special_food_enabled:
+            roll = ids[(self.rng.random(self.num_envs) < BONUS_CHANCE) & (self.bonus_cell < 0) & ~dones]
+            if len(roll):
+                self._spawn_food(roll, np.full(len(roll), BONUS_CODE, dtype=np.uint8))
+
+        # Keep every board stocked once its last (bonus) food has expired
+        starved = ids[(self.foods_alive == 0) & ~dones]
+        if len(starved):
+            codes = self._random_food_codes(len(starved))
+            codes[(codes == BONUS_CODE) & (self.bonus_cell[starved] >= 0)] = REGULAR_CODE
+            self._spawn_food(starved, codes)
+
+        # Check for speed effect expiration
+        ended = (self.speed_effect_time > 0) & (self.tick > self.speed_effect_time)
+        self.speed_modifier[ended] = 1.0
+        self.speed_effect_time[ended] = 0
+
+        # Auto-reset finished games, keeping their results for the caller
+        finished = ids[dones]
+        self.final_score[finished] = self.score[finished]
+        self.final_length[finished] = self.length[finished]
+        self._reset_envs(finished)
+
+        return rewards, dones